@@ -1,14 +1,33 @@
+import os
+
 import pandas as pd
 import streamlit as st
-import plotly.express as px
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression
-from sklearn.preprocessing import LabelEncoder
 from datetime import datetime, timezone
 
+from charts import (WHAT_IF_LABELS, age_figure, gender_figure, grade_box_figure, grade_histogram_figure,
+                    pass_rate_figure, trend_figure, what_if_curve_figure, what_if_heatmap_figure)
+from drift import check_csv
+from engine import EDUCATION_LEVELS, PASS_MARK, TOP_MARK, WHAT_IF_RANGES, form_to_record, predict_grid, score_csv
+from instrumentation import METRICS, cache_miss, cached_call, stage, start_metrics_server, start_rerun, timed
+from report import summary_card_html, summary_values, term_card_html
+from stats import GENDER_LABELS, TERM_COLUMNS
+from tenants import TenantCache
+
 # Page Configuration
 st.set_page_config(page_title="Student Performance Analytics", page_icon="📚", layout="wide")
 
+# Instrumentation: every stage below is timed into this rerun, which ends as
+# one JSON log line, and into process-wide totals (📈 Diagnostics page, and
+# a Prometheus endpoint when STUDENT_METRICS_PORT is set)
+rerun = start_rerun()
+
+@st.cache_resource
+def metrics_server(port):
+    return start_metrics_server(os.environ.get('STUDENT_METRICS_HOST', '127.0.0.1'), port)
+
+if os.environ.get('STUDENT_METRICS_PORT'):
+    metrics_server(int(os.environ['STUDENT_METRICS_PORT']))
+
 # Updated CSS
 st.markdown("""
     <style>
@@ -159,12 +178,38 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # Load Data
-@st.cache_data
-def load_data():
-    data = pd.read_csv(r"D:\Downloads\students.csv")
-    return data
-
-data = load_data()
+# Every school configured in datasource.load_tenants has its own table, model
+# and aggregates, held in a TenantCache shared by every session: switching
+# schools reuses a loaded bundle, or loads it (and its registered model) from
+# disk, evicting the least recently used schools past the memory budget. In
+# streaming mode (STUDENT_DATA_STREAMING, CSV only) a school's table is never
+# built: the file is folded chunk by chunk into running aggregates, and the
+# cards, charts and model all come from those.
+@st.cache_resource
+def tenant_cache():
+    return TenantCache()
+
+tenants = tenant_cache()
+METRICS.collectors['tenant'] = tenants.info
+if len(tenants.names) > 1:
+    school = st.sidebar.selectbox("🏫 School", tenants.names, key="school")
+else:
+    school = tenants.names[0]
+
+ingest_progress = None
+
+def show_ingest_progress(fraction, rows):
+    global ingest_progress
+    if ingest_progress is None:
+        ingest_progress = st.progress(0.0)
+    ingest_progress.progress(fraction, text=f"Reading students... {rows:,} rows")
+
+with stage('tenant'), st.spinner("Loading school..."):
+    bundle = tenants.get(school, on_progress=show_ingest_progress)
+if ingest_progress is not None:
+    ingest_progress.empty()
+
+data, data_hash = bundle.data, bundle.data_hash
 
 # Remove the date/time header
 # Add current user's login with custom styling
@@ -181,22 +226,39 @@ st.markdown(f"""
     </div>
 """, unsafe_allow_html=True)
 
-# Data Preprocessing
-def preprocess_data(data):
-    label_encoders = {}
-    for column in data.select_dtypes(include=['object']).columns:
-        label_encoders[column] = LabelEncoder()
-        data[column] = label_encoders[column].fit_transform(data[column])
-    return data, label_encoders
-
-data_processed, label_encoders = preprocess_data(data.copy())
-
-# Model Training
-features = data_processed.drop(columns=['Term_3'])
-target = data_processed['Term_3']
-X_train, X_test, y_train, y_test = train_test_split(features, target, test_size=0.2, random_state=42)
-model = LinearRegression()
-model.fit(X_train, y_train)
+# Model, prediction cache (shared by every session, so repeated form answers
+# and simultaneous submits cost one vectorized predict between them), cohort
+# index and ranking index all belong to the school's bundle
+trained = bundle.trained
+predictor = bundle.predictor
+METRICS.collectors['prediction'] = predictor.info
+cohort_cube = bundle.cohort_cube
+
+# label -> (index key, lowest first)
+RANKINGS = {
+    "Lowest predicted final grade": ('predicted', True),
+    "Highest predicted final grade": ('predicted', False),
+    "Largest drop, Term 1 → Term 2": ('term_1_to_2', True),
+    "Largest drop, Term 2 → Term 3": ('term_2_to_3', True),
+    "Largest drop, Term 1 → Term 3": ('term_1_to_3', True),
+    "Largest gain, Term 1 → Term 2": ('term_1_to_2', False),
+}
+
+COHORT_FILTERS = {
+    'gender': ("Gender", lambda value: GENDER_LABELS.get(value, value)),
+    'age': ("Age", str),
+    'famsize': ("Family Size", str),
+    'Pstatus': ("Parents Status", lambda value: {'T': "Together", 'A': "Apart"}.get(value, value)),
+    'Medu': ("Mother's Education", lambda value: EDUCATION_LEVELS[value] if 0 <= value < len(EDUCATION_LEVELS) else str(value)),
+    'Fedu': ("Father's Education", lambda value: EDUCATION_LEVELS[value] if 0 <= value < len(EDUCATION_LEVELS) else str(value)),
+    'studytime': ("Study Time", str),
+    'internet': ("Internet Access", lambda value: value.capitalize()),
+}
+
+# The 📈 Diagnostics page is hidden unless the URL has ?diagnostics=1 (or STUDENT_DIAGNOSTICS is set)
+PAGES = ["🏠 Dashboard", "📊 Analysis", "🔮 Prediction", "📋 Rankings"]
+if st.query_params.get('diagnostics') or os.environ.get('STUDENT_DIAGNOSTICS'):
+    PAGES.append("📈 Diagnostics")
 
 # Updated sidebar
 with st.sidebar:
@@ -207,252 +269,58 @@ with st.sidebar:
     """, unsafe_allow_html=True)
     
     selected = st.radio("",
-        options=["🏠 Dashboard", "📊 Analysis", "🔮 Prediction"],
+        options=PAGES,
         key="navigation",
         index=0)
 
-# Dashboard Page
-if selected == "🏠 Dashboard":
-    st.title("🏠 Student Performance Dashboard")
-    
-    # Summary Cards at the top
-    st.markdown("### 📊 Overall Performance Summary")
-    summary_col1, summary_col2, summary_col3, summary_col4 = st.columns(4)
-    
-    total_students = len(data)
-    overall_avg = round((data['Term_1'].mean() + data['Term_2'].mean() + data['Term_3'].mean())/3, 1)
-    total_passed = (data['Term_3'] >= 10).sum()
-    top_students = (data['Term_3'] >= 15).sum()
-
-    with summary_col1:
-        st.markdown("""
-        <div style='background-color: #2ecc71; padding: 20px; border-radius: 10px; color: white'>
-            <h1 style='text-align: center; font-size: 24px;'>{}</h1>
-            <p style='text-align: center; font-size: 16px; margin: 0;'>Total Students</p>
-        </div>
-        """.format(total_students), unsafe_allow_html=True)
-
-    with summary_col2:
-        st.markdown("""
-        <div style='background-color: #3498db; padding: 20px; border-radius: 10px; color: white'>
-            <h1 style='text-align: center; font-size: 24px;'>{}</h1>
-            <p style='text-align: center; font-size: 16px; margin: 0;'>Overall Average</p>
-        </div>
-        """.format(overall_avg), unsafe_allow_html=True)
-
-    with summary_col3:
-        st.markdown("""
-        <div style='background-color: #e74c3c; padding: 20px; border-radius: 10px; color: white'>
-            <h1 style='text-align: center; font-size: 24px;'>{}</h1>
-            <p style='text-align: center; font-size: 16px; margin: 0;'>Passed Students</p>
-        </div>
-        """.format(total_passed), unsafe_allow_html=True)
-
-    with summary_col4:
-        st.markdown("""
-        <div style='background-color: #f1c40f; padding: 20px; border-radius: 10px; color: white'>
-            <h1 style='text-align: center; font-size: 24px;'>{}</h1>
-            <p style='text-align: center; font-size: 16px; margin: 0;'>Top Performers</p>
-        </div>
-        """.format(top_students), unsafe_allow_html=True)
-
-    # Spacing
-    st.markdown("<br>", unsafe_allow_html=True)
-
-    # Term-wise Performance Cards with different text colors
-    st.markdown("### 📝 Term-wise Performance")
-    
-    term_col1, term_col2, term_col3 = st.columns(3)
-    
-    # Term 1 Card with blue text
-    with term_col1:
-        st.markdown("""
-        <div style='background-color: #f8f9fa; padding: 20px; border-radius: 10px; border: 2px solid #e0e0e0'>
-            <h3 style='text-align: center; color: #3498db; margin-bottom: 15px;'>Term 1</h3>
-            <div style='display: grid; grid-template-columns: 1fr; gap: 10px;'>
-                <div style='background-color: white; padding: 10px; border-radius: 5px; text-align: center;'>
-                    <p style='margin: 0; color: #666;'>Average Grade</p>
-                    <h2 style='margin: 5px 0; color: #2c3e50;'>{}</h2>
-                </div>
-                <div style='background-color: white; padding: 10px; border-radius: 5px; text-align: center;'>
-                    <p style='margin: 0; color: #666;'>Pass Rate</p>
-                    <h2 style='margin: 5px 0; color: #2c3e50;'>{}%</h2>
-                </div>
-                <div style='background-color: white; padding: 10px; border-radius: 5px; text-align: center;'>
-                    <p style='margin: 0; color: #666;'>Failed Students</p>
-                    <h2 style='margin: 5px 0; color: #e74c3c;'>{}</h2>
-                </div>
-                <div style='background-color: white; padding: 10px; border-radius: 5px; text-align: center;'>
-                    <p style='margin: 0; color: #666;'>Top Performers</p>
-                    <h2 style='margin: 5px 0; color: #f1c40f;'>{}</h2>
-                </div>
-            </div>
-        </div>
-        """.format(
-            round(data['Term_1'].mean(), 1),
-            round((data['Term_1'] >= 10).mean() * 100, 1),
-            (data['Term_1'] < 10).sum(),
-            (data['Term_1'] >= 15).sum()
-        ), unsafe_allow_html=True)
-
-    # Term 2 Card with green text
-    with term_col2:
-        st.markdown("""
-        <div style='background-color: #f8f9fa; padding: 20px; border-radius: 10px; border: 2px solid #e0e0e0'>
-            <h3 style='text-align: center; color: #2ecc71; margin-bottom: 15px;'>Term 2</h3>
-            <div style='display: grid; grid-template-columns: 1fr; gap: 10px;'>
-                <div style='background-color: white; padding: 10px; border-radius: 5px; text-align: center;'>
-                    <p style='margin: 0; color: #666;'>Average Grade</p>
-                    <h2 style='margin: 5px 0; color: #2c3e50;'>{}</h2>
-                </div>
-                <div style='background-color: white; padding: 10px; border-radius: 5px; text-align: center;'>
-                    <p style='margin: 0; color: #666;'>Pass Rate</p>
-                    <h2 style='margin: 5px 0; color: #2c3e50;'>{}%</h2>
-                </div>
-                <div style='background-color: white; padding: 10px; border-radius: 5px; text-align: center;'>
-                    <p style='margin: 0; color: #666;'>Failed Students</p>
-                    <h2 style='margin: 5px 0; color: #e74c3c;'>{}</h2>
-                </div>
-                <div style='background-color: white; padding: 10px; border-radius: 5px; text-align: center;'>
-                    <p style='margin: 0; color: #666;'>Top Performers</p>
-                    <h2 style='margin: 5px 0; color: #f1c40f;'>{}</h2>
-                </div>
-            </div>
-        </div>
-        """.format(
-            round(data['Term_2'].mean(), 1),
-            round((data['Term_2'] >= 10).mean() * 100, 1),
-            (data['Term_2'] < 10).sum(),
-            (data['Term_2'] >= 15).sum()
-        ), unsafe_allow_html=True)
-
-    # Term 3 Card with purple text
-    with term_col3:
-        st.markdown("""
-        <div style='background-color: #f8f9fa; padding: 20px; border-radius: 10px; border: 2px solid #e0e0e0'>
-            <h3 style='text-align: center; color: #9b59b6; margin-bottom: 15px;'>Term 3</h3>
-            <div style='display: grid; grid-template-columns: 1fr; gap: 10px;'>
-                <div style='background-color: white; padding: 10px; border-radius: 5px; text-align: center;'>
-                    <p style='margin: 0; color: #666;'>Average Grade</p>
-                    <h2 style='margin: 5px 0; color: #2c3e50;'>{}</h2>
-                </div>
-                <div style='background-color: white; padding: 10px; border-radius: 5px; text-align: center;'>
-                    <p style='margin: 0; color: #666;'>Pass Rate</p>
-                    <h2 style='margin: 5px 0; color: #2c3e50;'>{}%</h2>
-                </div>
-                <div style='background-color: white; padding: 10px; border-radius: 5px; text-align: center;'>
-                    <p style='margin: 0; color: #666;'>Failed Students</p>
-                    <h2 style='margin: 5px 0; color: #e74c3c;'>{}</h2>
-                </div>
-                <div style='background-color: white; padding: 10px; border-radius: 5px; text-align: center;'>
-                    <p style='margin: 0; color: #666;'>Top Performers</p>
-                    <h2 style='margin: 5px 0; color: #f1c40f;'>{}</h2>
-                </div>
-            </div>
-        </div>
-        """.format(
-            round(data['Term_3'].mean(), 1),
-            round((data['Term_3'] >= 10).mean() * 100, 1),
-            (data['Term_3'] < 10).sum(),
-            (data['Term_3'] >= 15).sum()
-        ), unsafe_allow_html=True)
-# Analysis Page
-elif selected == "📊 Analysis":
-    st.title("📊 Detailed Analysis")
-    
-    tab1, tab2 = st.tabs(["📈 Performance Analysis", "👥 Demographics"])
-    
-    with tab1:
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            # Term Performance Comparison
-            term_data = pd.melt(data[['Term_1', 'Term_2', 'Term_3']], 
-                               var_name='Term', value_name='Grade')
-            fig_box = px.box(term_data, x='Term', y='Grade',
-                           title='Grade Distribution Across Terms',
-                           color='Term',
-                           color_discrete_sequence=['#3498db', '#2ecc71', '#e74c3c'])
-            st.plotly_chart(fig_box, use_container_width=True)
-            
-            # Grade Distribution
-            fig_grade = px.histogram(data, x='Term_3',
-                                   title='Final Term Grade Distribution',
-                                   labels={'Term_3': 'Grade'},
-                                   color_discrete_sequence=['#2ecc71'])
-            fig_grade.update_layout(bargap=0.1)
-            st.plotly_chart(fig_grade, use_container_width=True)
-        
-        with col2:
-            # Performance Trend
-            avg_grades = {
-                'Term': ['Term 1', 'Term 2', 'Term 3'],
-                'Average': [data['Term_1'].mean(),
-                          data['Term_2'].mean(),
-                          data['Term_3'].mean()]
-            }
-            fig_trend = px.line(avg_grades, x='Term', y='Average',
-                               title='Average Grade Trend',
-                               markers=True,
-                               line_shape='linear')
-            fig_trend.update_traces(marker_size=10)
-            st.plotly_chart(fig_trend, use_container_width=True)
-            
-            # Pass Rate Comparison
-            pass_rates = {
-                'Term': ['Term 1', 'Term 2', 'Term 3'],
-                'Pass Rate': [(data['Term_1'] >= 10).mean() * 100,
-                             (data['Term_2'] >= 10).mean() * 100,
-                             (data['Term_3'] >= 10).mean() * 100]
-            }
-            fig_pass = px.bar(pass_rates, x='Term', y='Pass Rate',
-                            title='Pass Rate by Term (%)',
-                            color='Term',
-                            color_discrete_sequence=['#3498db', '#2ecc71', '#e74c3c'])
-            st.plotly_chart(fig_pass, use_container_width=True)
-    
-    with tab2:
-        demo_col1, demo_col2 = st.columns(2)
-        
-        with demo_col1:
-            # Gender Distribution
-            gender_counts = data['gender'].value_counts()
-            fig_gender = px.pie(values=gender_counts.values,
-                              names=['Male', 'Female'],
-                              title='Gender Distribution',
-                              color_discrete_sequence=['#3498db', '#e74c3c'])
-            fig_gender.update_traces(textposition='inside', 
-                                   textinfo='percent+label',
-                                   textfont_size=14)
-            fig_gender.update_layout(showlegend=True,
-                                   legend=dict(orientation="h", 
-                                             yanchor="bottom", 
-                                             y=1.02,
-                                             xanchor="right", 
-                                             x=1))
-            st.plotly_chart(fig_gender, use_container_width=True)
-        
-        with demo_col2:
-            # Age Distribution with Orange color
-            fig_age = px.histogram(data, x='age',
-                                 title='Age Distribution',
-                                 color_discrete_sequence=['#FFA500'])  # Changed to orange
-            fig_age.update_layout(
-                bargap=0.2,
-                xaxis_title="Age",
-                yaxis_title="Count",
-                showlegend=False,
-                xaxis=dict(dtick=1),
-                bargroupgap=0.1
-            )
-            fig_age.update_traces(marker_line_width=1,
-                                marker_line_color="white")
-            st.plotly_chart(fig_age, use_container_width=True)
-            
-# Prediction Page
-elif selected == "🔮 Prediction":
-    st.title("🔮 Grade Prediction")
-    
+    with st.expander("🎯 Cohort Filter"):
+        cohort_filters = {}
+        if cohort_cube is None:
+            st.caption("Cohort filtering needs the full table, so it is off in streaming mode.")
+        for column, (label, format_func) in COHORT_FILTERS.items():
+            if cohort_cube is not None and column in cohort_cube.columns:
+                cohort_filters[column] = st.multiselect(label, cohort_cube.options(column),
+                                                        format_func=format_func, key=f"cohort_{column}")
+
+# Cohort selection: the school's whole-table aggregates, or sums over the
+# cohort cube. Only the Dashboard and Analysis pages draw them; Prediction
+# ignores the cohort and Rankings filters its rows.
+AGGREGATE_PAGES = ("🏠 Dashboard", "📊 Analysis")
+cohort_active = any(cohort_filters.values())
+cohort_size = cohort_cube.size(cohort_filters) if cohort_active else None
+if cohort_size == 0 and selected != "🔮 Prediction":
+    st.warning("No students match the selected cohort filters.")
+    st.session_state['last_rerun'] = rerun.finish(page=selected)
+    st.stop()
+term_stats = bundle.term_stats
+demographics = bundle.demographics
+if cohort_active and selected in AGGREGATE_PAGES:
+    with stage('aggregate.cohort'):
+        term_stats = cohort_cube.term_stats(cohort_filters)
+        demographics = cohort_cube.demographics(cohort_filters)
+
+# Chart Figures
+# Shared by every session and rebuilt only when the data, cohort or chart
+# changes; st.plotly_chart only reads the figure.
+cohort_key = tuple((column, tuple(values)) for column, values in cohort_filters.items() if values)
+
+@st.cache_resource(max_entries=256)
+def cached_figure(name, data_hash, cohort_key, _build, _stats):
+    cache_miss()
+    return _build(_stats)
+
+def chart(name, build, stats):
+    return cached_call('chart.' + name, cached_figure, name, data_hash, cohort_key, build, stats)
+
+# Page Sections
+# Sections with their own widgets run as fragments where Streamlit has them
+# (st.fragment, 1.33+), so submitting the form or uploading a file reruns
+# only that section instead of the whole script. Older versions render them
+# as plain functions.
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda func: func)
+
+@fragment
+def prediction_form():
     with st.form("prediction_form"):
         col1, col2, col3 = st.columns([1,1,1])
         
@@ -467,10 +335,8 @@ elif selected == "🔮 Prediction":
         
         with col2:
             st.subheader("Family Background")
-            Medu = st.selectbox("Mother's Education",
-                ["No Education", "Primary", "Secondary", "Higher Secondary", "Degree"])
-            Fedu = st.selectbox("Father's Education",
-                ["No Education", "Primary", "Secondary", "Higher Secondary", "Degree"])
+            Medu = st.selectbox("Mother's Education", EDUCATION_LEVELS)
+            Fedu = st.selectbox("Father's Education", EDUCATION_LEVELS)
             Pstatus = st.radio("Parents Status", ["Together", "Apart"], horizontal=True)
         
         with col3:
@@ -487,32 +353,16 @@ elif selected == "🔮 Prediction":
                 type="primary")
     
     # Prediction Results
+    # Kept in the session, so the result (and the what-if panel under it)
+    # survives the reruns triggered by the what-if controls
     if submitted:
         # Convert inputs to model format
-        user_input = {
-            'gender': 1 if gender == "Female" else 0,
-            'age': age,
-            'Medu': {"No Education": 0, "Primary": 1, "Secondary": 2, 
-                     "Higher Secondary": 3, "Degree": 4}[Medu],
-            'Fedu': {"No Education": 0, "Primary": 1, "Secondary": 2, 
-                     "Higher Secondary": 3, "Degree": 4}[Fedu],
-            'Pstatus': 1 if Pstatus == "Together" else 0,
-            'Term_1': Term_1,
-            'Term_2': Term_2,
-            'activities': 1 if activities == "Yes" else 0,
-            'internet': 1 if internet == "Yes" else 0,
-            'absences': absences
-        }
-        
-        # Create DataFrame and ensure column order matches training data
-        input_df = pd.DataFrame([user_input])
-        for col in features.columns:
-            if col not in input_df.columns:
-                input_df[col] = 0
-        input_df = input_df[features.columns]
-        
+        st.session_state['prediction_record'] = form_to_record(gender, age, Medu, Fedu, Pstatus, Term_1, Term_2,
+                                                               activities, internet, absences)
+    user_input = st.session_state.get('prediction_record')
+    if user_input is not None:
         try:
-            prediction = model.predict(input_df)[0]
+            prediction = timed('predict', predictor.predict, user_input)
             prediction = round(prediction)
             
             # Display result in columns
@@ -528,7 +378,7 @@ elif selected == "🔮 Prediction":
                 
                 st.metric("Predicted Grade", f"{prediction}/20")
                 
-                if prediction < 10:
+                if prediction < PASS_MARK:
                     st.error("⚠️ Below Passing Grade")
                     st.markdown("""
                         **Recommendations:**
@@ -538,7 +388,7 @@ elif selected == "🔮 Prediction":
                         * Review previous materials
                         * Consider joining study groups
                     """)
-                elif prediction < 15:
+                elif prediction < TOP_MARK:
                     st.warning("📝 Average Performance")
                     st.markdown("""
                         **Suggestions for Improvement:**
@@ -563,4 +413,237 @@ elif selected == "🔮 Prediction":
         
         except Exception as e:
             st.error(f"Error making prediction: {str(e)}")
-            st.info("Please ensure all inputs are filled correctly.")
\ No newline at end of file
+            st.info("Please ensure all inputs are filled correctly.")
+            return
+
+        what_if_panel(user_input)
+
+# What-if Explorer
+# Sweeps one input (a curve) or two (a heatmap) over their form ranges with
+# everything else held at the submitted answers; the grid is scored in a
+# single predict call, so even absences x term grade (94 x 21) is ~1 ms.
+WHAT_IF_NONE = "Nothing (curve)"
+
+def what_if_panel(record):
+    st.subheader("🔍 What If?")
+    sweepable = [column for column in WHAT_IF_RANGES if column in trained.pipeline.positions]
+    if not sweepable:
+        st.info("The active model does not use any of the inputs the what-if explorer can vary.")
+        return
+    columns = {WHAT_IF_LABELS[column]: column for column in sweepable}
+    what_if_col1, what_if_col2 = st.columns(2)
+    x_label = what_if_col1.selectbox("Vary", list(columns), key="what_if_x")
+    y_label = what_if_col2.selectbox("Against", [WHAT_IF_NONE] + [label for label in columns if label != x_label],
+                                     key="what_if_y")
+
+    x_column = columns[x_label]
+    axes = {x_column: WHAT_IF_RANGES[x_column]}
+    if y_label != WHAT_IF_NONE:
+        y_column = columns[y_label]
+        axes[y_column] = WHAT_IF_RANGES[y_column]
+    grid = timed('predict.what_if', predict_grid, record, trained, axes)
+    if len(axes) == 1:
+        figure = what_if_curve_figure(x_column, axes[x_column], grid, record.get(x_column))
+    else:
+        figure = what_if_heatmap_figure(x_column, axes[x_column], y_column, axes[y_column], grid)
+    st.plotly_chart(figure, use_container_width=True)
+
+# A session holds one encoded copy of its scored upload: st.download_button
+# keeps whatever it is given in memory anyway, so a file on disk would only
+# add a copy that outlives the session. Dropped once downloaded or replaced.
+def discard_batch_output():
+    st.session_state.pop('batch_csv', None)
+
+@fragment
+def batch_prediction():
+    st.markdown("<br>", unsafe_allow_html=True)
+    st.subheader("📁 Batch Prediction")
+    uploaded = st.file_uploader("Upload a CSV of students (same columns as the training data)",
+                                type="csv")
+
+    if uploaded is not None:
+        batch_key = (uploaded.file_id, trained.data_hash)
+        if st.session_state.get('batch_key') != batch_key:
+            discard_batch_output()
+            st.session_state['batch_key'] = batch_key
+            st.session_state['batch_counts'] = None
+            st.session_state['batch_drift'] = None
+            reference = bundle.sketch
+            try:
+                with st.spinner("Checking and scoring students..."):
+                    # Checked before scoring, so the Data Check explains a file
+                    # that then fails to score (an unknown category, a bad grade)
+                    if reference is not None:
+                        st.session_state['batch_drift'] = timed(
+                            'drift.check', check_csv, uploaded, reference, trained.pipeline.label_encoders)
+                        uploaded.seek(0)
+                    band_counts = pd.Series(dtype='int64')
+                    parts = []
+                    for i, scored in enumerate(score_csv(uploaded, trained)):
+                        parts.append(scored.to_csv(header=(i == 0), index=False).encode('utf-8'))
+                        band_counts = band_counts.add(scored['Performance'].value_counts(), fill_value=0)
+                st.session_state['batch_csv'] = b''.join(parts)
+                st.session_state['batch_counts'] = band_counts.astype(int)
+            except Exception as e:
+                discard_batch_output()
+                st.session_state['batch_error'] = str(e)
+
+        if st.session_state.get('batch_key') == batch_key:
+            band_counts = st.session_state['batch_counts']
+            if band_counts is None:
+                st.error(f"Error scoring file: {st.session_state['batch_error']}")
+                st.info("Please check the file uses the same columns and categories as the training data.")
+            else:
+                band_col1, band_col2, band_col3 = st.columns(3)
+                band_col1.metric("Below Passing", band_counts.get('Below Passing', 0))
+                band_col2.metric("Average", band_counts.get('Average', 0))
+                band_col3.metric("Excellent", band_counts.get('Excellent', 0))
+                if 'batch_csv' in st.session_state:
+                    st.download_button("Download Predictions", st.session_state['batch_csv'],
+                                       file_name="predictions.csv", mime="text/csv", on_click=discard_batch_output)
+                else:
+                    st.caption("Predictions downloaded. Upload the file again to score it again.")
+
+            report = st.session_state['batch_drift']
+            if report is not None:
+                if report.retrain:
+                    reasons = report.drifted + [f"unseen levels in {column}" for column in report.unseen_levels]
+                    st.warning(f"These students differ from the model's training data ({', '.join(reasons)}). "
+                               "Predictions may be off; retrain on data that includes them.")
+                with st.expander("🩺 Data Check"):
+                    st.caption(f"Drift (PSI) of {report.rows:,} uploaded students against the training data: "
+                               f"below 0.1 is stable, {report.threshold:g} or more counts as drift")
+                    st.dataframe(report.scores, hide_index=True, use_container_width=True)
+                    if len(report.violations):
+                        st.dataframe(report.violations, hide_index=True, use_container_width=True)
+                    else:
+                        st.caption("No missing columns, blanks, out-of-range grades or unseen levels.")
+
+rerun.mark('render.' + selected.split(' ', 1)[1].lower())
+
+# Dashboard Page
+if selected == "🏠 Dashboard":
+    st.title("🏠 Student Performance Dashboard")
+    if cohort_active:
+        st.caption(f"Cohort: {cohort_size} of {len(data)} students")
+    
+    # Summary Cards at the top
+    st.markdown("### 📊 Overall Performance Summary")
+    for column, card in zip(st.columns(4), summary_values(term_stats)):
+        with column:
+            st.markdown(summary_card_html(*card), unsafe_allow_html=True)
+
+    # Spacing
+    st.markdown("<br>", unsafe_allow_html=True)
+
+    # Term-wise Performance Cards with different text colors
+    st.markdown("### 📝 Term-wise Performance")
+    
+    for column, term in zip(st.columns(3), TERM_COLUMNS):
+        with column:
+            st.markdown(term_card_html(term_stats, term), unsafe_allow_html=True)
+# Analysis Page
+elif selected == "📊 Analysis":
+    st.title("📊 Detailed Analysis")
+    if cohort_active:
+        st.caption(f"Cohort: {cohort_size} of {len(data)} students")
+    
+    tab1, tab2 = st.tabs(["📈 Performance Analysis", "👥 Demographics"])
+    
+    with tab1:
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.plotly_chart(chart('grade_box', grade_box_figure, term_stats), use_container_width=True)
+            st.plotly_chart(chart('grade_histogram', grade_histogram_figure, term_stats), use_container_width=True)
+        
+        with col2:
+            st.plotly_chart(chart('trend', trend_figure, term_stats), use_container_width=True)
+            st.plotly_chart(chart('pass_rate', pass_rate_figure, term_stats), use_container_width=True)
+    
+    with tab2:
+        demo_col1, demo_col2 = st.columns(2)
+        
+        with demo_col1:
+            st.plotly_chart(chart('gender', gender_figure, demographics), use_container_width=True)
+        
+        with demo_col2:
+            st.plotly_chart(chart('age', age_figure, demographics), use_container_width=True)
+            
+# Prediction Page
+elif selected == "🔮 Prediction":
+    st.title("🔮 Grade Prediction")
+
+    with st.expander("📐 Model Quality"):
+        metrics = trained.metrics
+        if metrics:
+            st.caption(f"{metrics['estimator']} on {metrics['features']} features, "
+                       f"evaluated by {metrics['evaluation']}")
+            quality_col1, quality_col2, quality_col3, quality_col4 = st.columns(4)
+            quality_col1.metric("RMSE", f"{metrics['rmse']:.2f}")
+            quality_col2.metric("MAE", f"{metrics['mae']:.2f}")
+            quality_col3.metric("R²", f"{metrics['r2']:.3f}")
+            quality_col4.metric("Pass/Fail Accuracy", f"{metrics['pass_accuracy']:.1%}")
+            leaderboard = bundle.leaderboard
+            if leaderboard is not None:
+                st.dataframe(leaderboard, hide_index=True, use_container_width=True)
+        else:
+            st.info("No evaluation recorded for this model. Run `python cli.py select` to cross-validate candidates.")
+    
+    prediction_form()
+
+    # Batch Prediction
+    batch_prediction()
+
+# Rankings Page
+elif selected == "📋 Rankings":
+    st.title("📋 Student Rankings")
+
+    if data is None:
+        st.info("Student rankings need the full table, so they are off in streaming mode.")
+    else:
+        ranking_index = bundle.ranking_index
+        if cohort_active:
+            st.caption(f"Cohort: {cohort_size} of {len(data)} students")
+
+        ranking_col1, ranking_col2 = st.columns([3, 1])
+        ranking = ranking_col1.selectbox("Rank by", list(RANKINGS))
+        top_n = ranking_col2.number_input("Students", min_value=1, max_value=1000, value=50)
+        key, ascending = RANKINGS[ranking]
+
+        with stage('ranking.query'):
+            rows = cohort_cube.rows(cohort_filters) if cohort_active else None
+            positions = ranking_index.top(key, top_n, rows, ascending)
+            ranked = ranking_index.table(data, positions, key)
+        st.dataframe(ranked, use_container_width=True)
+        st.download_button("Download Ranking", ranked.to_csv(), file_name="ranking.csv", mime="text/csv")
+
+# Diagnostics Page (hidden)
+elif selected == "📈 Diagnostics":
+    st.title("📈 Diagnostics")
+
+    last = st.session_state.get('last_rerun')
+    if last:
+        st.subheader("Previous Rerun")
+        st.caption(f"{last['total_ms']:.1f} ms on {last['page']}, peak RSS {last['peak_rss_mib']:.1f} MiB")
+        st.dataframe(pd.DataFrame({'ms': last['stages'], 'cache': pd.Series(last['cache'], dtype=object)}),
+                     use_container_width=True)
+
+    st.subheader("Stages (this process)")
+    st.dataframe(pd.DataFrame(METRICS.stage_table()), hide_index=True, use_container_width=True)
+
+    st.subheader("Caches")
+    st.dataframe(pd.DataFrame(METRICS.cache_table()), hide_index=True, use_container_width=True,
+                 column_config={'hit_rate': st.column_config.ProgressColumn("Hit Rate", min_value=0, max_value=1)})
+
+    if len(tenants.names) > 1:
+        st.subheader("Schools")
+        st.caption(f"{len(tenants.loaded())} of {len(tenants.names)} loaded, "
+                   f"budget {tenants.budget / 2**20:,.0f} MiB, least recently used first")
+        st.dataframe(pd.DataFrame(tenants.loaded(), columns=['school', 'MiB']), hide_index=True,
+                     use_container_width=True)
+
+    with st.expander("Prometheus metrics"):
+        st.code(METRICS.prometheus_text(), language='text')
+
+st.session_state['last_rerun'] = rerun.finish(page=selected)
\ No newline at end of file
@@ -0,0 +1,199 @@
+# Benchmarks for each stage behind the dashboard, run headlessly on synthetic
+# student tables with the students.csv schema.
+#   python benchmark.py run --sizes 1000 100000 1000000 10000000 -o results.json
+#   python benchmark.py compare baseline.json results.json
+# Each stage reports latency percentiles over --repeats runs, throughput in
+# rows/s and tracemalloc peak memory (measured on one extra run so the
+# tracing overhead stays out of the timings).
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+import charts
+import drift
+from datasource import DEFAULT_DATA_PATH, load_config, read_csv
+from engine import (TARGET, WHAT_IF_RANGES, load_data, predict_batch, predict_grid, predict_record, preprocess_data,
+                    train_model)
+from ingest import ingest_csv
+from predictor import CachedPredictor
+from ranking import RankingIndex
+from report import render_report
+from stats import compute_demographics, compute_term_stats
+
+DEFAULT_SIZES = [1_000, 100_000, 1_000_000, 10_000_000]
+SINGLE_PREDICTIONS = 1_000
+
+
+def synthetic_students(rows, seed=0):
+    # Bootstrap rows of students.csv, so every column keeps its dtype, range
+    # and correlation with the others
+    students = read_csv(DEFAULT_DATA_PATH)
+    picks = np.random.default_rng(seed).integers(0, len(students), rows)
+    return students.iloc[picks].reset_index(drop=True)
+
+def build_charts(term_stats, demographics):
+    return [charts.grade_box_figure(term_stats), charts.grade_histogram_figure(term_stats),
+            charts.trend_figure(term_stats), charts.pass_rate_figure(term_stats),
+            charts.gender_figure(demographics), charts.age_figure(demographics)]
+
+def measure(stage, rows, func, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings_ms = np.array(timings) * 1000
+    p50 = float(np.percentile(timings_ms, 50))
+    return {
+        'stage': stage,
+        'rows': rows,
+        'repeats': repeats,
+        'mean_ms': float(timings_ms.mean()),
+        'p50_ms': p50,
+        'p95_ms': float(np.percentile(timings_ms, 95)),
+        'p99_ms': float(np.percentile(timings_ms, 99)),
+        'rows_per_s': rows / (p50 / 1000) if p50 else None,
+        'peak_mib': peak / 2**20,
+    }
+
+def run_size(rows, repeats, workdir):
+    data = synthetic_students(rows)
+    csv_path = os.path.join(workdir, f"students_{rows}.csv")
+    data.to_csv(csv_path, index=False)
+    uncached = load_config()._replace(path=csv_path, format='csv', cache_dir='')
+    cached = uncached._replace(cache_dir=os.path.join(workdir, 'cache'))
+    load_data(cached)  # writes the Parquet copy timed by load_cached
+
+    trained = train_model(data, data_hash='benchmark')
+    term_stats = compute_term_stats(data)
+    demographics = compute_demographics(data)
+    record = data.drop(columns=[TARGET]).head(1).to_dict('records')[0]
+    records = data.drop(columns=[TARGET]).head(SINGLE_PREDICTIONS).to_dict('records')
+    predictor = CachedPredictor(trained)
+    ranking_index = RankingIndex(data, trained)
+    reference_sketch = drift.FeatureSketch().update(data)
+
+    def predict_single():
+        for _ in range(SINGLE_PREDICTIONS):
+            predict_record(record, trained)
+
+    def predict_cached():
+        for student in records:
+            predictor.predict(student)
+
+    predict_cached()  # warm, so the stage times the cache-hit path
+
+    stages = [
+        ('load_csv', rows, lambda: load_data(uncached)),
+        ('load_cached', rows, lambda: load_data(cached)),
+        ('ingest_stream', rows, lambda: ingest_csv(csv_path)),
+        ('preprocess', rows, lambda: preprocess_data(data)),
+        ('train', rows, lambda: train_model(data, data_hash='benchmark')),
+        ('term_stats', rows, lambda: compute_term_stats(data)),
+        ('demographics', rows, lambda: compute_demographics(data)),
+        ('charts', rows, lambda: build_charts(term_stats, demographics)),
+        ('report_render', rows, lambda: render_report('benchmark', '', term_stats, demographics)),
+        ('predict_batch', rows, lambda: predict_batch(data, trained)),
+        ('predict_single', SINGLE_PREDICTIONS, predict_single),
+        ('predict_cached', len(records), predict_cached),
+        ('ranking_index', rows, lambda: RankingIndex(data, trained)),
+        ('ranking_top', rows, lambda: (ranking_index.top('predicted', 50), ranking_index.top('term_1_to_2', 50))),
+        ('drift_check', rows, lambda: drift.compare(reference_sketch, drift.FeatureSketch().update(data),
+                                                    trained.pipeline.label_encoders)),
+        ('what_if_grid', len(WHAT_IF_RANGES['absences']) * len(WHAT_IF_RANGES['Term_2']),
+         lambda: predict_grid(record, trained, {'absences': WHAT_IF_RANGES['absences'],
+                                                'Term_2': WHAT_IF_RANGES['Term_2']})),
+    ]
+    results = []
+    for stage, stage_rows, func in stages:
+        result = measure(stage, stage_rows, func, repeats)
+        result['table_rows'] = rows
+        results.append(result)
+        print(f"{rows:>10} {stage:<15} p50 {result['p50_ms']:>10.2f} ms  p95 {result['p95_ms']:>10.2f} ms  "
+              f"peak {result['peak_mib']:>8.1f} MiB", file=sys.stderr)
+    return results
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run(args):
+    results = []
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in args.sizes:
+            results.extend(run_size(rows, args.repeats, workdir))
+    report = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {len(results)} results to {args.output}", file=sys.stderr)
+
+def compare(args):
+    # Ratio of p50 latency new/old per (table size, stage); above 1 is slower
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = {(r['table_rows'], r['stage']): r for r in json.load(f)['results']}
+    with open(args.current, encoding='utf-8') as f:
+        current = json.load(f)['results']
+    regressions = 0
+    for result in current:
+        old = baseline.get((result['table_rows'], result['stage']))
+        if old is None or not old['p50_ms']:
+            continue
+        ratio = result['p50_ms'] / old['p50_ms']
+        flag = ''
+        if ratio > 1 + args.threshold:
+            flag = '  REGRESSION'
+            regressions += 1
+        print(f"{result['table_rows']:>10} {result['stage']:<15} {old['p50_ms']:>10.2f} -> "
+              f"{result['p50_ms']:>10.2f} ms  x{ratio:.2f}{flag}")
+    return 1 if regressions else 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's load/train/aggregate/predict stages.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help="run the benchmarks and save JSON results")
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    run_parser.add_argument('--repeats', type=int, default=5)
+    run_parser.add_argument('-o', '--output', default='benchmark_results.json')
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser('compare', help="compare two result files")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10, help="allowed slowdown before flagging")
+    compare_parser.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    sys.exit(args.func(args) or 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+# Plotly figure definitions for the Analysis and Prediction pages. They only build figures
+# (no Streamlit calls), so the dashboard, benchmarks and report jobs share them.
+# Every figure is drawn from pre-aggregated stats (stats.py), never from raw
+# rows, so the JSON sent to the browser is sized by bins, not by students.
+import plotly.express as px
+import plotly.graph_objects as go
+
+from engine import PASS_MARK
+from stats import TERM_COLUMNS, TERM_LABELS
+
+TERM_COLORS = ['#3498db', '#2ecc71', '#e74c3c']
+
+
+# Term Performance Comparison (box stats precomputed, outliers drawn once per grade)
+def grade_box_figure(term_stats):
+    stats = term_stats.summary
+    fig_box = go.Figure()
+    for term, color in zip(TERM_COLUMNS, TERM_COLORS):
+        row = stats.loc[term]
+        fig_box.add_trace(go.Box(
+            name=term, x=[term], marker_color=color,
+            q1=[row['q1']], median=[row['median']], q3=[row['q3']],
+            lowerfence=[row['lowerfence']], upperfence=[row['upperfence']]))
+        grades = term_stats.histogram[term]
+        outliers = grades[(grades > 0) & ((grades.index < row['lowerfence']) |
+                                          (grades.index > row['upperfence']))]
+        fig_box.add_trace(go.Scatter(
+            x=[term] * len(outliers), y=outliers.index, mode='markers',
+            marker_color=color, showlegend=False, hoverinfo='y'))
+    fig_box.update_layout(title='Grade Distribution Across Terms',
+                          xaxis_title='Term', yaxis_title='Grade',
+                          legend_title_text='Term')
+    return fig_box
+
+# Grade Distribution
+def grade_histogram_figure(term_stats):
+    grade_counts = term_stats.histogram['Term_3'].reset_index(name='count')
+    fig_grade = px.bar(grade_counts, x='Grade', y='count',
+                       title='Final Term Grade Distribution',
+                       color_discrete_sequence=['#2ecc71'])
+    fig_grade.update_layout(bargap=0.1)
+    return fig_grade
+
+# Performance Trend
+def trend_figure(term_stats):
+    avg_grades = {
+        'Term': TERM_LABELS,
+        'Average': term_stats.summary['mean'].tolist()
+    }
+    fig_trend = px.line(avg_grades, x='Term', y='Average',
+                        title='Average Grade Trend',
+                        markers=True,
+                        line_shape='linear')
+    fig_trend.update_traces(marker_size=10)
+    return fig_trend
+
+# Pass Rate Comparison
+def pass_rate_figure(term_stats):
+    pass_rates = {
+        'Term': TERM_LABELS,
+        'Pass Rate': term_stats.summary['pass_rate'].tolist()
+    }
+    return px.bar(pass_rates, x='Term', y='Pass Rate',
+                  title='Pass Rate by Term (%)',
+                  color='Term',
+                  color_discrete_sequence=TERM_COLORS)
+
+# Gender Distribution
+def gender_figure(demographics):
+    gender_counts = demographics.gender
+    fig_gender = px.pie(values=gender_counts.values,
+                        names=gender_counts.index,
+                        title='Gender Distribution',
+                        color_discrete_sequence=['#3498db', '#e74c3c'])
+    fig_gender.update_traces(textposition='inside',
+                             textinfo='percent+label',
+                             textfont_size=14)
+    fig_gender.update_layout(showlegend=True,
+                             legend=dict(orientation="h",
+                                         yanchor="bottom",
+                                         y=1.02,
+                                         xanchor="right",
+                                         x=1))
+    return fig_gender
+
+# Age Distribution with Orange color
+def age_figure(demographics):
+    bins = demographics.age
+    fig_age = go.Figure(go.Bar(x=bins['center'], y=bins['count'], marker_color='#FFA500'))
+    fig_age.update_layout(
+        title='Age Distribution',
+        bargap=0.2,
+        xaxis_title="Age",
+        yaxis_title="Count",
+        showlegend=False,
+        xaxis=dict(dtick=1),
+        bargroupgap=0.1
+    )
+    fig_age.update_traces(marker_line_width=1,
+                          marker_line_color="white")
+    return fig_age
+
+
+# What-if Sweeps (Prediction page)
+WHAT_IF_LABELS = {'absences': 'Absences', 'Term_1': 'Term 1 Grade', 'Term_2': 'Term 2 Grade', 'age': 'Age'}
+
+def what_if_curve_figure(column, values, predictions, current=None):
+    label = WHAT_IF_LABELS.get(column, column)
+    fig_curve = go.Figure(go.Scatter(x=list(values), y=predictions, mode='lines', line_color='#3498db',
+                                     name='Predicted Grade'))
+    fig_curve.add_hline(y=PASS_MARK, line_dash='dash', line_color='#e74c3c',
+                        annotation_text='Passing Grade')
+    if current is not None:
+        fig_curve.add_vline(x=current, line_dash='dot', line_color='#7f8c8d',
+                            annotation_text='Current')
+    fig_curve.update_layout(title=f'Predicted Grade by {label}', xaxis_title=label,
+                            yaxis_title='Predicted Grade', showlegend=False)
+    return fig_curve
+
+def what_if_heatmap_figure(x_column, x_values, y_column, y_values, grid):
+    # `grid` is indexed [x, y], as returned by engine.predict_grid
+    x_label = WHAT_IF_LABELS.get(x_column, x_column)
+    y_label = WHAT_IF_LABELS.get(y_column, y_column)
+    fig_heat = go.Figure(go.Heatmap(x=list(x_values), y=list(y_values), z=grid.T, colorscale='RdYlGn',
+                                    zmin=0, zmax=20, colorbar_title='Grade'))
+    fig_heat.add_trace(go.Contour(x=list(x_values), y=list(y_values), z=grid.T, showscale=False,
+                                  contours=dict(start=PASS_MARK, end=PASS_MARK, coloring='none'),
+                                  line=dict(color='black', width=2, dash='dash'), hoverinfo='skip'))
+    fig_heat.update_layout(title=f'Predicted Grade by {x_label} and {y_label}',
+                           xaxis_title=x_label, yaxis_title=y_label)
+    return fig_heat
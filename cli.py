@@ -0,0 +1,244 @@
+# Command-line entry point for headless training and scoring.
+#   python cli.py train [students.csv]
+#   python cli.py update new_term_rows.csv
+#   python cli.py select [students.csv] --folds 5
+#   python cli.py models
+#   python cli.py activate v1
+#   python cli.py score students.csv -o predictions.csv
+#   python cli.py serve --port 8502
+#   python cli.py memory [students.csv]
+#   python cli.py report [school.csv ...] -o reports --cohort "gender=F"
+#   python cli.py drift new_term.csv --retrain
+import argparse
+import os
+import sys
+
+import pandas as pd
+
+from datasource import compact_frame, load_tenants, memory_report, read_csv, resolve_source
+from drift import DRIFT_THRESHOLD, check_csv
+from engine import BATCH_CHUNK_ROWS, TARGET, dataset_hash, load_artifact, load_data, save_artifact, score_file
+from instrumentation import peak_rss_mib
+from registry import DEFAULT_REGISTRY_DIR, ModelRegistry
+from selection import DEFAULT_FOLDS
+
+
+def _load_model(args):
+    # An explicit artifact file wins; otherwise the registry's version or current one
+    if args.model:
+        return load_artifact(args.model)
+    return ModelRegistry(args.registry).load(args.version)
+
+def train(args):
+    data, data_hash = load_data(args.data)
+    version, trained = ModelRegistry(args.registry).train(data, data_hash, activate=not args.no_activate)
+    print(f"Trained {version} on {len(data)} rows ({data_hash[:12]})")
+    if args.output:
+        save_artifact(trained, args.output)
+        print(f"Exported to {args.output}")
+
+def update(args):
+    chunks = read_csv(args.data, chunksize=args.chunksize)
+    version, trained = ModelRegistry(args.registry).update(chunks, args.version, activate=not args.no_activate)
+    print(f"Updated to {version} ({trained.data_hash[:12]})")
+    if args.output:
+        save_artifact(trained, args.output)
+        print(f"Exported to {args.output}")
+
+def select(args):
+    data, data_hash = load_data(args.data)
+    version, trained, leaderboard = ModelRegistry(args.registry).select(
+        data, data_hash, activate=not args.no_activate, folds=args.folds, workers=args.workers)
+    with pd.option_context('display.width', 120, 'display.float_format', '{:.3f}'.format):
+        print(leaderboard.to_string(index=False))
+    metrics = trained.metrics
+    print(f"\nRegistered {version}: {metrics['estimator']} on {metrics['features']} features, "
+          f"RMSE {metrics['rmse']:.3f}, R² {metrics['r2']:.3f} ({metrics['evaluation']})")
+    if args.output:
+        save_artifact(trained, args.output)
+        print(f"Exported to {args.output}")
+
+def models(args):
+    registry = ModelRegistry(args.registry)
+    current = registry.current()
+    for entry in registry.versions():
+        marker = '*' if entry['version'] == current else ' '
+        print(f"{marker} {entry['version']:<6} {entry['created']}  {entry.get('method', 'full'):<11} "
+              f"rows={entry['rows']}  data={entry['data_hash'][:12]}", end='')
+        metrics = entry.get('metrics')
+        if metrics:
+            print(f"  rmse={metrics['rmse']:.3f} ({metrics['evaluation']})", end='')
+        if entry.get('drift') is not None:
+            print(f"  drift={entry['drift']:.3f}", end='')
+        print()
+
+def activate(args):
+    ModelRegistry(args.registry).activate(args.version)
+    print(f"Active model is now {args.version}")
+
+def score(args):
+    trained = _load_model(args)
+    rows = score_file(args.data, args.output, trained, chunksize=args.chunksize)
+    print(f"Scored {rows} rows, written to {args.output}", file=sys.stderr)
+
+def serve(args):
+    from server import DEFAULT_BACKLOG, make_server
+
+    server = make_server(_load_model(args), args.host, args.port, args.backlog or DEFAULT_BACKLOG)
+    print(f"Serving predictions on http://{args.host}:{args.port}/predict")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def memory(args):
+    source = resolve_source(args.data)
+    data, _ = load_data(source)
+    baseline = pd.read_csv(source.path) if source.format == 'csv' else None
+    report = memory_report(data, baseline)
+    with pd.option_context('display.max_rows', None, 'display.width', 120):
+        print(report)
+    total = report.loc['TOTAL']
+    print(f"\n{len(data)} rows: {total['bytes'] / 2**20:.2f} MiB", end='')
+    if baseline is not None:
+        print(f" vs {total['baseline_bytes'] / 2**20:.2f} MiB as plain read_csv "
+              f"({total['baseline_bytes'] / total['bytes']:.1f}x smaller)", end='')
+    print()
+    peak = peak_rss_mib()
+    if peak is not None:
+        print(f"Peak RSS: {peak:.1f} MiB")
+
+def report(args):
+    from report import export_reports, parse_cohort
+
+    if args.data:
+        tenants = {os.path.splitext(os.path.basename(path))[0]: resolve_source(path) for path in args.data}
+    else:
+        tenants = load_tenants()
+    cohorts = [parse_cohort(text) for text in args.cohort]
+
+    def done(rows):
+        for filename, school, cohort, students, seconds in rows:
+            print(f"{filename:<40} {students:>9,} students  {seconds:6.2f}s", file=sys.stderr)
+
+    rows = export_reports(args.output, tenants, cohorts, args.workers, args.plotlyjs, on_done=done)
+    print(f"Wrote {len(rows)} reports for {len(tenants)} schools to {os.path.join(args.output, 'index.html')}")
+
+def drift(args):
+    registry = ModelRegistry(args.registry)
+    version = args.version or registry.current()
+    reference = registry.load_sketch(version)
+    if reference is None:
+        raise FileNotFoundError(f"Model {version} has no training data sketch; retrain it to enable drift checks")
+    report = check_csv(args.data, reference, registry.load(version).pipeline.label_encoders, args.threshold)
+    with pd.option_context('display.width', 120, 'display.float_format', '{:.3f}'.format):
+        print(report.scores.to_string(index=False))
+        if len(report.violations):
+            print()
+            print(report.violations.to_string(index=False))
+    print(f"\n{report.rows} rows against {version}: max PSI {report.max_psi:.3f} (threshold {args.threshold:g})", end='')
+    if not report.retrain:
+        print(", no retraining needed")
+        return
+    print(f", retraining needed (drift: {report.drifted or 'none'}, unseen levels: {report.unseen_levels or 'none'})")
+    if args.retrain:
+        data = _with_new_rows(args.data)
+        data_hash = dataset_hash(data)
+        new_version, _ = registry.train(data, data_hash, drift=report.max_psi)
+        print(f"Trained {new_version} on {len(data)} rows ({data_hash[:12]})")
+
+def _with_new_rows(path):
+    # The configured training data with the checked file's students appended;
+    # they need final grades to be trained on
+    new_rows = read_csv(path)
+    if TARGET not in new_rows.columns:
+        raise ValueError(f"{path} has no {TARGET} column, so it cannot be trained on; "
+                         "retrain once its students' final grades are in")
+    data, _ = load_data()
+    missing = [column for column in data.columns if column not in new_rows.columns]
+    if missing:
+        raise ValueError(f"{path} is missing columns needed for training: {missing}")
+    return compact_frame(pd.concat([data, new_rows[data.columns]], ignore_index=True))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Student performance model: train, score and serve.")
+    parser.add_argument('--registry', default=DEFAULT_REGISTRY_DIR, help="model registry directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = commands.add_parser('train', help="fit the model and register a new version")
+    train_parser.add_argument('data', nargs='?', help="training data (default: the configured data source)")
+    train_parser.add_argument('-o', '--output', help="also export the artifact to this file")
+    train_parser.add_argument('--no-activate', action='store_true', help="register without making it current")
+    train_parser.set_defaults(func=train)
+
+    update_parser = commands.add_parser('update', help="fold appended rows into a model without retraining")
+    update_parser.add_argument('data', help="CSV of the newly appended rows only")
+    update_parser.add_argument('--version', help="version to update (default: current)")
+    update_parser.add_argument('-o', '--output', help="also export the artifact to this file")
+    update_parser.add_argument('--no-activate', action='store_true', help="register without making it current")
+    update_parser.add_argument('--chunksize', type=int, default=BATCH_CHUNK_ROWS)
+    update_parser.set_defaults(func=update)
+
+    select_parser = commands.add_parser('select', help="cross-validate candidate models and register the best")
+    select_parser.add_argument('data', nargs='?', help="training data (default: the configured data source)")
+    select_parser.add_argument('--folds', type=int, default=DEFAULT_FOLDS)
+    select_parser.add_argument('--workers', type=int, help="worker processes (default: one per core)")
+    select_parser.add_argument('-o', '--output', help="also export the artifact to this file")
+    select_parser.add_argument('--no-activate', action='store_true', help="register without making it current")
+    select_parser.set_defaults(func=select)
+
+    models_parser = commands.add_parser('models', help="list registered model versions")
+    models_parser.set_defaults(func=models)
+
+    activate_parser = commands.add_parser('activate', help="make a registered version current (rollback)")
+    activate_parser.add_argument('version')
+    activate_parser.set_defaults(func=activate)
+
+    score_parser = commands.add_parser('score', help="score a CSV of students")
+    score_parser.add_argument('data', help="CSV of students to score")
+    score_parser.add_argument('-o', '--output', default=sys.stdout)
+    score_parser.add_argument('--chunksize', type=int, default=BATCH_CHUNK_ROWS)
+    score_parser.set_defaults(func=score)
+
+    serve_parser = commands.add_parser('serve', help="run the local HTTP scoring endpoint")
+    serve_parser.add_argument('--host', default='127.0.0.1')
+    serve_parser.add_argument('--port', type=int, default=8502)
+    serve_parser.add_argument('--backlog', type=int, help="pending connections to queue (default: STUDENT_SERVER_BACKLOG or 128)")
+    serve_parser.set_defaults(func=serve)
+
+    memory_parser = commands.add_parser('memory', help="report per-column memory of the loaded table")
+    memory_parser.add_argument('data', nargs='?', help="data file (default: the configured data source)")
+    memory_parser.set_defaults(func=memory)
+
+    report_parser = commands.add_parser('report', help="export static HTML dashboard reports")
+    report_parser.add_argument('data', nargs='*', help="one data file per school (default: the configured schools)")
+    report_parser.add_argument('-o', '--output', default='reports', help="output directory")
+    report_parser.add_argument('--cohort', action='append', default=[],
+                               help="also report this cohort per school, e.g. \"gender=F;age=15,16\" (repeatable)")
+    report_parser.add_argument('--workers', type=int, help="worker processes (default: one per core)")
+    report_parser.add_argument('--plotlyjs', choices=['directory', 'cdn', 'inline'], default='directory',
+                               help="how pages load plotly.js (default: one shared copy in the output directory)")
+    report_parser.set_defaults(func=report)
+
+    drift_parser = commands.add_parser('drift', help="check new data for drift and quality problems")
+    drift_parser.add_argument('data', help="CSV of new students")
+    drift_parser.add_argument('--version', help="registered version to compare with (default: current)")
+    drift_parser.add_argument('--threshold', type=float, default=DRIFT_THRESHOLD, help="PSI that counts as drift")
+    drift_parser.add_argument('--retrain', action='store_true',
+                              help="if it drifted, train a new version on the configured data plus these rows (needs Term_3)")
+    drift_parser.set_defaults(func=drift)
+
+    for command_parser in (score_parser, serve_parser):
+        command_parser.add_argument('--model', help="model artifact (.npz) to use instead of the registry")
+        command_parser.add_argument('--version', help="registered version (default: current)")
+
+    args = parser.parse_args(argv)
+    try:
+        args.func(args)
+    except (FileNotFoundError, ValueError) as e:
+        parser.exit(1, f"error: {e}\n")
+
+if __name__ == '__main__':
+    main()
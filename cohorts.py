@@ -0,0 +1,96 @@
+# Cohort filtering over the low-cardinality student columns.
+# The table is grouped once by every combination of COHORT_COLUMNS levels.
+# Each group keeps its size and per-term grade histogram (the cube), and rows
+# are sorted by group with offsets (the index). A filter then only masks the
+# group keys (at most a few thousand rows, however many students there are)
+# and sums the histograms it selects; TermStats and DemographicStats come
+# straight from those sums.
+import numpy as np
+import pandas as pd
+
+from engine import PASS_MARK, TOP_MARK
+from stats import MAX_GRADE, TERM_COLUMNS, demographics_from_counts, term_stats_from_counts
+
+COHORT_COLUMNS = ['gender', 'age', 'famsize', 'Pstatus', 'Medu', 'Fedu', 'studytime', 'internet']
+
+
+def _levels_and_codes(values):
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.categories.to_numpy(), values.cat.codes.to_numpy().astype(np.int64)
+    levels, codes = np.unique(values.to_numpy(), return_inverse=True)
+    return levels, codes
+
+
+class CohortCube:
+    def __init__(self, data, columns=COHORT_COLUMNS):
+        self.columns = [column for column in columns if column in data.columns]
+        self.levels = {}
+        row_codes = []
+        for column in self.columns:
+            self.levels[column], codes = _levels_and_codes(data[column])
+            row_codes.append(codes)
+        shape = [len(self.levels[column]) for column in self.columns]
+
+        # Group id per row = position of its level combination among those present
+        flat = np.ravel_multi_index(row_codes, shape)
+        group_ids, group_of_row = np.unique(flat, return_inverse=True)
+        self.keys = np.stack(np.unravel_index(group_ids, shape), axis=1)
+        self.sizes = np.bincount(group_of_row, minlength=len(group_ids))
+
+        # Sorted group offsets: rows of group g are order[offsets[g]:offsets[g + 1]]
+        self.order = np.argsort(group_of_row, kind='stable')
+        self.offsets = np.concatenate([[0], np.cumsum(self.sizes)])
+
+        # Per-group grade histograms, shape (groups, terms, grades), in one bincount
+        grades = data[TERM_COLUMNS].to_numpy(dtype=np.int64)
+        terms, width = len(TERM_COLUMNS), max(MAX_GRADE, int(grades.max())) + 1
+        cells = (group_of_row[:, None] * terms + np.arange(terms)) * width + grades
+        self.term_counts = np.bincount(cells.ravel(), minlength=len(group_ids) * terms * width)
+        self.term_counts = self.term_counts.reshape(len(group_ids), terms, width)
+
+    @property
+    def nbytes(self):
+        return self.keys.nbytes + self.sizes.nbytes + self.order.nbytes + self.offsets.nbytes + self.term_counts.nbytes
+
+    def options(self, column):
+        return self.levels[column].tolist()
+
+    def mask(self, filters):
+        # `filters` maps column -> allowed levels; missing or empty means any
+        selected = np.ones(len(self.keys), dtype=bool)
+        for column, allowed in (filters or {}).items():
+            if not allowed:
+                continue
+            j = self.columns.index(column)
+            allowed_codes = np.flatnonzero(np.isin(self.levels[column], allowed))
+            selected &= np.isin(self.keys[:, j], allowed_codes)
+        return selected
+
+    def size(self, filters):
+        return int(self.sizes[self.mask(filters)].sum())
+
+    def rows(self, filters):
+        # Row positions of the cohort, gathered group by group from the index
+        groups = np.flatnonzero(self.mask(filters))
+        if len(groups) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate([self.order[self.offsets[g]:self.offsets[g + 1]] for g in groups])
+
+    def level_counts(self, column, filters=None):
+        selected = self.mask(filters)
+        j = self.columns.index(column)
+        counts = np.bincount(self.keys[selected, j], weights=self.sizes[selected],
+                             minlength=len(self.levels[column])).astype(np.int64)
+        return pd.Series(counts, index=self.levels[column])
+
+    def term_stats(self, filters=None, pass_mark=PASS_MARK, top_mark=TOP_MARK):
+        counts = self.term_counts[self.mask(filters)].sum(axis=0)
+        return term_stats_from_counts(counts, pass_mark, top_mark)
+
+    def demographics(self, filters=None):
+        gender = self.level_counts('gender', filters)
+        gender.index = gender.index.astype(str)
+        ages = self.level_counts('age', filters)
+        ages = ages[ages > 0]
+        age_bins = pd.DataFrame({'start': ages.index, 'width': 1, 'center': ages.index, 'count': ages.values})
+        return demographics_from_counts(gender, age_bins)
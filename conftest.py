@@ -0,0 +1,20 @@
+# Shared test fixtures: the bundled students.csv, read the way the app reads
+# it (without the Parquet cache, so tests leave nothing behind), and a model
+# trained on it. Session-scoped, so tests copy before changing them.
+import os
+
+import pytest
+
+from datasource import BASE_DIR, compact_frame, read_csv
+from engine import dataset_hash, train_model
+
+STUDENTS_CSV = os.path.join(BASE_DIR, 'students.csv')
+
+
+@pytest.fixture(scope='session')
+def students():
+    return compact_frame(read_csv(STUDENTS_CSV))
+
+@pytest.fixture(scope='session')
+def trained(students):
+    return train_model(students, dataset_hash(students))
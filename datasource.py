@@ -0,0 +1,200 @@
+# Pluggable student data source.
+# Configured through environment variables, or an INI file named by
+# STUDENT_DATA_CONFIG (default: datasource.ini next to this file):
+#
+#   [data]
+#   path = /srv/exports/district.csv   ; STUDENT_DATA_PATH
+#   format = csv                       ; STUDENT_DATA_FORMAT: csv | parquet | arrow (default: from extension)
+#   cache_dir = .data_cache            ; STUDENT_DATA_CACHE_DIR, empty to disable the columnar cache
+#   streaming = false                  ; STUDENT_DATA_STREAMING: CSV only, see ingest.py
+#
+# A deployment serving several schools lists one dataset per school, either as
+# [school:<name>] sections in the same INI file (same keys as [data], which
+# supplies the defaults) or as every data file in STUDENT_TENANTS_DIR (the
+# school is named after the file). See tenants.py.
+#
+# CSVs are parsed with an explicit dtype schema, then a Parquet copy is cached
+# so later startups skip text parsing. Parquet/Arrow need pyarrow; without it
+# CSV still works, just uncached. Whatever the format, the frame handed back is
+# compacted: small-int columns and 2-level string columns as categories.
+import configparser
+import hashlib
+import json
+import os
+import tempfile
+from typing import NamedTuple
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATA_PATH = os.path.join(BASE_DIR, 'students.csv')
+DEFAULT_CACHE_DIR = os.path.join(BASE_DIR, '.data_cache')
+DEFAULT_CONFIG_PATH = os.path.join(BASE_DIR, 'datasource.ini')
+
+CSV_DTYPES = {
+    'gender': 'category',
+    'age': 'int8',
+    'famsize': 'category',
+    'Pstatus': 'category',
+    'Medu': 'int8',
+    'Fedu': 'int8',
+    'traveltime': 'int8',
+    'studytime': 'int8',
+    'internet': 'category',
+    'famrel': 'int8',
+    'goout': 'int8',
+    'health': 'int8',
+    'absences': 'int16',
+    'Term_1': 'int8',
+    'Term_2': 'int8',
+    'Term_3': 'int8',
+}
+SCHEMA_VERSION = hashlib.sha1(json.dumps(CSV_DTYPES, sort_keys=True).encode()).hexdigest()[:8]
+
+# Object columns with at most this share of distinct values become categories
+CATEGORY_MAX_RATIO = 0.5
+
+FORMATS = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow',
+}
+
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+DEFAULT_TENANT = 'default'
+
+
+class DataSourceConfig(NamedTuple):
+    path: str
+    format: str
+    cache_dir: str
+    streaming: bool = False  # aggregate the CSV chunk by chunk instead of loading the table
+
+def _read_ini(environ):
+    parser = configparser.ConfigParser()
+    parser.read(environ.get('STUDENT_DATA_CONFIG', DEFAULT_CONFIG_PATH))
+    return parser
+
+def load_config(environ=os.environ):
+    parser = _read_ini(environ)
+    section = parser['data'] if parser.has_section('data') else {}
+
+    path = environ.get('STUDENT_DATA_PATH', section.get('path', DEFAULT_DATA_PATH))
+    data_format = environ.get('STUDENT_DATA_FORMAT', section.get('format', ''))
+    cache_dir = environ.get('STUDENT_DATA_CACHE_DIR', section.get('cache_dir', DEFAULT_CACHE_DIR))
+    streaming = environ.get('STUDENT_DATA_STREAMING', section.get('streaming', '')).lower() in TRUE_VALUES
+    return DataSourceConfig(path, data_format or infer_format(path), cache_dir, streaming)
+
+def load_tenants(environ=os.environ):
+    # School name -> DataSourceConfig; a single DEFAULT_TENANT when none are configured
+    base = load_config(environ)
+    tenants = {}
+    directory = environ.get('STUDENT_TENANTS_DIR')
+    if directory:
+        for filename in sorted(os.listdir(directory)):
+            stem, extension = os.path.splitext(filename)
+            if extension.lower() in FORMATS:
+                tenants[stem] = base._replace(path=os.path.join(directory, filename), format=FORMATS[extension.lower()])
+
+    parser = _read_ini(environ)
+    for name in parser.sections():
+        if not name.startswith('school:'):
+            continue
+        section = parser[name]
+        path = section.get('path')
+        if not path:
+            raise ValueError(f"[{name}] has no path")
+        tenants[name[len('school:'):].strip()] = base._replace(
+            path=path,
+            format=section.get('format') or infer_format(path),
+            cache_dir=section.get('cache_dir', base.cache_dir),
+            streaming=section.get('streaming', str(base.streaming)).lower() in TRUE_VALUES,
+        )
+    return tenants or {DEFAULT_TENANT: base}
+
+def resolve_source(source=None):
+    # `source` is a file path or a DataSourceConfig; None uses the configured source
+    if source is None:
+        return load_config()
+    if isinstance(source, str):
+        return load_config()._replace(path=source, format=infer_format(source))
+    return source
+
+def infer_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot tell the format of {path}; set STUDENT_DATA_FORMAT")
+    return FORMATS[extension]
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def _cache_path(config):
+    # Keyed on the source file's identity, so an edited or replaced CSV re-parses
+    stat = os.stat(config.path)
+    key = f"{os.path.abspath(config.path)}|{stat.st_size}|{stat.st_mtime_ns}|{SCHEMA_VERSION}"
+    stem = os.path.splitext(os.path.basename(config.path))[0]
+    return os.path.join(config.cache_dir, f"{stem}-{hashlib.sha1(key.encode()).hexdigest()[:16]}.parquet")
+
+# Downcasts columns in place (one column at a time, never a second full
+# frame) for sources that were not parsed with CSV_DTYPES
+def compact_frame(data):
+    for column in data.columns:
+        values = data[column]
+        if pd.api.types.is_integer_dtype(values.dtype) and values.dtype.itemsize > 1:
+            data[column] = pd.to_numeric(values, downcast='integer')
+        elif values.dtype == object and values.nunique() <= CATEGORY_MAX_RATIO * len(values):
+            data[column] = values.astype('category')
+    return data
+
+def memory_report(data, baseline=None):
+    # Bytes per column (deep, so object strings count), optionally against
+    # the same table as a plain pd.read_csv would hold it
+    report = pd.DataFrame({
+        'dtype': data.dtypes.astype(str),
+        'bytes': data.memory_usage(index=False, deep=True),
+    })
+    if baseline is not None:
+        report['baseline_dtype'] = baseline.dtypes.astype(str)
+        report['baseline_bytes'] = baseline.memory_usage(index=False, deep=True)
+    totals = report.sum(numeric_only=True).to_frame('TOTAL').T
+    return pd.concat([report, totals]).astype({column: 'int64' for column in totals.columns})
+
+def read_csv(path, **kwargs):
+    return pd.read_csv(path, dtype=CSV_DTYPES, **kwargs)
+
+def read_table(config=None):
+    config = config or load_config()
+    if config.format == 'parquet':
+        return compact_frame(pd.read_parquet(config.path))
+    if config.format == 'arrow':
+        return compact_frame(pd.read_feather(config.path))
+    if config.format != 'csv':
+        raise ValueError(f"Unsupported data format: {config.format}")
+
+    if not config.cache_dir or not _has_pyarrow():
+        return compact_frame(read_csv(config.path))
+    cache_path = _cache_path(config)
+    if os.path.exists(cache_path):
+        return compact_frame(pd.read_parquet(cache_path))
+    data = compact_frame(read_csv(config.path))
+    os.makedirs(config.cache_dir, exist_ok=True)
+    # A unique temporary name, so processes filling the cache at once don't
+    # write into (or move away) each other's file
+    fd, tmp_path = tempfile.mkstemp(dir=config.cache_dir, suffix='.parquet.tmp')
+    os.close(fd)
+    try:
+        data.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, cache_path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return data
@@ -0,0 +1,210 @@
+# Drift and data-quality checks of new student data against a model's training data.
+# A FeatureSketch keeps exact value counts per column (every students.csv
+# column is a category or a small integer, so this stays a few hundred
+# numbers), built in one streaming pass and saved next to each registered
+# model (vN.sketch.npz). compare() scores a new batch's sketch against it:
+#   drift:      population stability index (PSI) per column, over the
+#               reference's decile bins for numeric columns and per level
+#               for categories; < 0.1 stable, >= DRIFT_THRESHOLD drifted
+#   violations: missing columns, blanks, non-numeric values, grades outside
+#               0-20, values outside the training range, and categorical
+#               levels the model's encoders have never seen
+# Retraining is only called for when a column drifts past the threshold or
+# unseen levels turn up; registry.load_or_train otherwise keeps the model.
+#   python cli.py drift new_term.csv
+import os
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from datasource import CSV_DTYPES
+from engine import BATCH_CHUNK_ROWS, TARGET
+from stats import MAX_GRADE, TERM_COLUMNS
+
+DRIFT_THRESHOLD = float(os.environ.get('STUDENT_DRIFT_THRESHOLD', 0.25))
+STABLE_PSI = 0.1
+DRIFT_BINS = 10
+PSI_EPSILON = 1e-4
+MAX_EXAMPLES = 5
+
+
+def is_categorical(column, values=None):
+    if column in CSV_DTYPES:
+        return CSV_DTYPES[column] == 'category'
+    return values is not None and not pd.api.types.is_numeric_dtype(values)
+
+def _value_counts(column, values):
+    # (counts indexed by level or numeric value, blanks, non-numeric values)
+    # Counted before any conversion, so only the distinct values are converted
+    counts = values.value_counts(sort=False)
+    counts = counts[counts > 0]  # a categorical dtype also lists its unused levels
+    missing = len(values) - int(counts.sum())
+    if is_categorical(column, values):
+        counts.index = counts.index.astype(str)
+        return counts.groupby(level=0).sum(), missing, 0
+    numbers = np.asarray(pd.to_numeric(counts.index, errors='coerce'), dtype=np.float64)
+    invalid = np.isnan(numbers)
+    numeric = pd.Series(counts.to_numpy()[~invalid], index=numbers[~invalid])
+    return numeric.groupby(level=0).sum(), missing, int(counts.to_numpy()[invalid].sum())
+
+
+class FeatureSketch:
+    def __init__(self):
+        self.rows = 0
+        self.counts = {}   # column -> pd.Series of counts by value
+        self.missing = {}  # column -> blank cells
+        self.invalid = {}  # column -> non-numeric cells in a numeric column
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        for column in chunk.columns:
+            counts, missing, invalid = _value_counts(column, chunk[column])
+            previous = self.counts.get(column)
+            self.counts[column] = counts if previous is None else previous.add(counts, fill_value=0).astype(np.int64)
+            self.missing[column] = self.missing.get(column, 0) + missing
+            self.invalid[column] = self.invalid.get(column, 0) + invalid
+        return self
+
+    def update_stream(self, chunks):
+        for chunk in chunks:
+            self.update(chunk)
+        return self
+
+    def observe(self, chunks):
+        # Counts each chunk on its way through to another consumer
+        for chunk in chunks:
+            self.update(chunk)
+            yield chunk
+
+    def save(self, path):
+        arrays = {'rows': np.int64(self.rows), 'columns': np.asarray(list(self.counts), dtype=str)}
+        for column, counts in self.counts.items():
+            dtype = str if is_categorical(column, counts.index) else np.float64
+            arrays['values__' + column] = np.asarray(counts.index, dtype=dtype)
+            arrays['counts__' + column] = counts.to_numpy(dtype=np.int64)
+            arrays['missing__' + column] = np.int64(self.missing[column])
+            arrays['invalid__' + column] = np.int64(self.invalid[column])
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        sketch = cls()
+        with np.load(path, allow_pickle=False) as arrays:
+            sketch.rows = int(arrays['rows'])
+            for column in arrays['columns'].tolist():
+                sketch.counts[column] = pd.Series(arrays['counts__' + column], index=arrays['values__' + column])
+                sketch.missing[column] = int(arrays['missing__' + column])
+                sketch.invalid[column] = int(arrays['invalid__' + column])
+        return sketch
+
+
+# Comparison
+def _bins(column, reference):
+    # Bin number per reference value: deciles of the reference for numeric
+    # columns with more distinct values than DRIFT_BINS, else one per value
+    if is_categorical(column, reference.index) or len(reference) <= DRIFT_BINS:
+        return None
+    reference = reference.sort_index()
+    shares = reference.cumsum().to_numpy() / reference.sum()
+    cuts = np.searchsorted(shares, np.arange(1, DRIFT_BINS) / DRIFT_BINS)
+    return np.unique(reference.index.to_numpy()[np.minimum(cuts, len(reference) - 1)])
+
+def _binned(counts, edges):
+    if edges is None:
+        return counts
+    bins = np.searchsorted(edges, counts.index.to_numpy(dtype=np.float64), side='left')
+    return counts.groupby(bins).sum()
+
+def psi(reference, batch):
+    # Population stability index of two count Series, aligned on their index
+    reference, batch = reference.align(batch, fill_value=0)
+    expected = (reference.to_numpy() + PSI_EPSILON) / (reference.sum() + PSI_EPSILON * len(reference))
+    actual = (batch.to_numpy() + PSI_EPSILON) / (batch.sum() + PSI_EPSILON * len(batch))
+    return float(((actual - expected) * np.log(actual / expected)).sum())
+
+def _mean(counts):
+    if len(counts) == 0 or counts.index.dtype == object:
+        return None
+    return float((counts.index.to_numpy(dtype=np.float64) * counts.to_numpy()).sum() / counts.sum())
+
+def _examples(values):
+    shown = [f"{value:g}" if isinstance(value, float) else str(value) for value in values[:MAX_EXAMPLES]]
+    return ', '.join(shown) + (', ...' if len(values) > MAX_EXAMPLES else '')
+
+
+class DriftReport(NamedTuple):
+    rows: int
+    scores: pd.DataFrame      # column, psi, status, reference_mean, batch_mean
+    violations: pd.DataFrame  # column, kind, rows, examples
+    threshold: float
+
+    @property
+    def drifted(self):
+        return self.scores.loc[self.scores['psi'] >= self.threshold, 'column'].tolist()
+
+    @property
+    def unseen_levels(self):
+        return self.violations.loc[self.violations['kind'] == 'unseen_level', 'column'].tolist()
+
+    @property
+    def max_psi(self):
+        return float(self.scores['psi'].max()) if len(self.scores) else 0.0
+
+    @property
+    def retrain(self):
+        return bool(self.drifted or self.unseen_levels)
+
+def compare(reference, batch, label_encoders=None, threshold=DRIFT_THRESHOLD):
+    # `label_encoders` are the model's (pipeline.label_encoders): levels they
+    # lack are reported as unseen_level rather than against the reference
+    label_encoders = label_encoders or {}
+    scores, violations = [], []
+
+    def violation(column, kind, rows, examples=''):
+        if rows:
+            violations.append({'column': column, 'kind': kind, 'rows': int(rows), 'examples': examples})
+
+    for column, expected in reference.counts.items():
+        if column not in batch.counts:
+            if column != TARGET:  # uploads to be scored have no final grade yet
+                violation(column, 'missing_column', batch.rows)
+            continue
+        actual = batch.counts[column]
+        violation(column, 'missing_value', batch.missing[column])
+        violation(column, 'not_numeric', batch.invalid[column])
+        if len(actual) == 0:
+            continue
+
+        if is_categorical(column, expected.index):
+            known = label_encoders[column].classes_ if column in label_encoders else expected.index
+            unseen = actual[~actual.index.isin(np.asarray(known, dtype=str))]
+            violation(column, 'unseen_level', unseen.sum(), _examples(unseen.index.tolist()))
+        else:
+            values = actual.index.to_numpy(dtype=np.float64)
+            if column in TERM_COLUMNS:
+                bad = (values < 0) | (values > MAX_GRADE)
+                violation(column, 'grade_out_of_range', actual[bad].sum(), _examples(values[bad].tolist()))
+            else:
+                low, high = expected.index.min(), expected.index.max()
+                outside = (values < low) | (values > high)
+                violation(column, 'outside_training_range', actual[outside].sum(),
+                          _examples(values[outside].tolist()))
+
+        edges = _bins(column, expected)
+        score = psi(_binned(expected, edges), _binned(actual, edges))
+        status = 'stable' if score < STABLE_PSI else 'moderate' if score < threshold else 'drift'
+        scores.append({'column': column, 'psi': score, 'status': status,
+                       'reference_mean': _mean(expected), 'batch_mean': _mean(actual)})
+
+    scores = pd.DataFrame(scores, columns=['column', 'psi', 'status', 'reference_mean', 'batch_mean'])
+    scores = scores.sort_values('psi', ascending=False, ignore_index=True)
+    violations = pd.DataFrame(violations, columns=['column', 'kind', 'rows', 'examples'])
+    return DriftReport(batch.rows, scores, violations, threshold)
+
+def check_csv(source, reference, label_encoders=None, threshold=DRIFT_THRESHOLD, chunksize=BATCH_CHUNK_ROWS):
+    # One streaming pass. Parsed without the dtype schema, so bad values are
+    # reported instead of failing the read.
+    batch = FeatureSketch().update_stream(pd.read_csv(source, chunksize=chunksize))
+    return compare(reference, batch, label_encoders, threshold)
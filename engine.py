@@ -0,0 +1,302 @@
+# Headless scoring engine: data loading, preprocessing, training and prediction.
+# Shared by the Streamlit dashboard and the CLI / HTTP scorer. Must not import
+# streamlit or plotly, and only imports scikit-learn when actually training.
+import hashlib
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from datasource import read_table, resolve_source
+from instrumentation import stage
+
+TARGET = 'Term_3'
+PASS_MARK = 10
+TOP_MARK = 15
+BATCH_CHUNK_ROWS = 100_000
+HASH_BLOCK_ROWS = 65_536
+EDUCATION_LEVELS = ["No Education", "Primary", "Secondary", "Higher Secondary", "Degree"]
+# Inputs the what-if explorer can sweep, over the Prediction form's ranges
+WHAT_IF_RANGES = {
+    'absences': range(0, 94),
+    'Term_1': range(0, 21),
+    'Term_2': range(0, 21),
+    'age': range(15, 23),
+}
+
+
+# Load Data
+# Content hash of a table, used as the cache key for everything derived from
+# it. Row hashes are chained in fixed blocks of HASH_BLOCK_ROWS, so the hash of
+# a file with rows appended can be computed from the saved state plus the new
+# rows alone, however the rows were split into chunks.
+class DatasetHasher:
+    def __init__(self, state=b'', rows=0, pending=b''):
+        self.state = state
+        self.rows = rows
+        self.pending = pending
+
+    def update(self, frame):
+        frame = frame.set_axis(pd.RangeIndex(self.rows, self.rows + len(frame)), copy=False)
+        self.pending += pd.util.hash_pandas_object(frame, index=True).values.tobytes()
+        self.rows += len(frame)
+        block_bytes = HASH_BLOCK_ROWS * 8
+        while len(self.pending) >= block_bytes:
+            self.state = hashlib.sha256(self.state + self.pending[:block_bytes]).digest()
+            self.pending = self.pending[block_bytes:]
+        return self
+
+    def hexdigest(self):
+        return hashlib.sha256(self.state + self.pending).hexdigest()
+
+def dataset_hash(data):
+    return DatasetHasher().update(data).hexdigest()
+
+def load_data(source=None):
+    # `source` is a file path or a DataSourceConfig; None uses the configured source
+    with stage('load.read'):
+        data = read_table(resolve_source(source))
+    with stage('load.hash'):
+        return data, dataset_hash(data)
+
+
+# Data Preprocessing
+class ClassEncoder:
+    # Drop-in for a fitted LabelEncoder's transform()
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+
+    def _lookup(self, values):
+        values = np.asarray(values).astype(str)
+        codes = np.minimum(np.searchsorted(self.classes_, values), len(self.classes_) - 1)
+        codes[self.classes_[codes] != values] = -1
+        return codes
+
+    def transform(self, values):
+        if isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+            # Look up each category once, then take by code
+            category_codes = values.cat.codes.to_numpy()
+            codes = np.where(category_codes >= 0, self._lookup(values.cat.categories)[category_codes], -1)
+        else:
+            codes = self._lookup(values)
+        unseen = codes < 0
+        if unseen.any():
+            labels = np.unique(np.asarray(values, dtype=str)[unseen]).tolist()
+            raise ValueError(f"y contains previously unseen labels: {labels}")
+        return codes
+
+# Builds the model matrix without copying the frame: string columns become
+# their category codes (LabelEncoder-compatible, since categories are sorted)
+# and numeric columns are used as they are. `data` is left untouched.
+def preprocess_data(data):
+    label_encoders = {}
+    columns = {}
+    for column in data.columns:
+        values = data[column]
+        if values.dtype == object:
+            values = values.astype('category')
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            categories = values.cat.categories
+            if not categories.is_monotonic_increasing:
+                values = values.cat.reorder_categories(categories.sort_values())
+            label_encoders[column] = ClassEncoder(values.cat.categories.to_numpy(dtype=str))
+            values = values.cat.codes
+        columns[column] = values
+    return pd.DataFrame(columns), label_encoders
+
+# The one encoding used for training matrices, batches and single records:
+# category columns through their ClassEncoder, numeric columns as floats,
+# and the training-set default (mean, or most common level) wherever a column
+# is missing or a value is blank. Output is a float64 matrix in model order.
+class FeaturePipeline:
+    def __init__(self, feature_columns, label_encoders, defaults=None):
+        self.feature_columns = list(feature_columns)
+        self.label_encoders = label_encoders
+        if defaults is None:
+            defaults = np.zeros(len(self.feature_columns))
+        self.defaults = np.asarray(defaults, dtype=np.float64)
+        self.positions = {column: i for i, column in enumerate(self.feature_columns)}
+
+    @classmethod
+    def fit(cls, features, label_encoders):
+        # `features` is the encoded matrix from preprocess_data, target removed
+        defaults = [np.bincount(features[column]).argmax() if column in label_encoders
+                    else features[column].mean()
+                    for column in features.columns]
+        return cls(features.columns, label_encoders, defaults)
+
+    def _encode(self, i, column, values):
+        missing = pd.isna(values)
+        if missing.all():
+            return np.full(len(missing), self.defaults[i])
+        if missing.any():
+            values = values[~missing]
+        encoder = self.label_encoders.get(column)
+        encoded = encoder.transform(values) if encoder is not None else np.asarray(values, dtype=np.float64)
+        if missing.any():
+            filled = np.full(len(missing), self.defaults[i])
+            filled[~np.asarray(missing)] = encoded
+            return filled
+        return encoded
+
+    def transform(self, frame):
+        X = np.empty((len(frame), len(self.feature_columns)))
+        for i, column in enumerate(self.feature_columns):
+            if column in frame.columns:
+                X[:, i] = self._encode(i, column, frame[column])
+            else:
+                X[:, i] = self.defaults[i]
+        return X
+
+    def transform_record(self, record):
+        # Single dict of raw values -> 1-row matrix, without building a DataFrame
+        row = self.defaults.copy()
+        for column, value in record.items():
+            i = self.positions.get(column)
+            if i is not None:
+                row[i] = self._encode(i, column, np.asarray([value], dtype=object))[0]
+        return row[np.newaxis, :]
+
+    def transform_grid(self, record, axes):
+        # One row per combination of `axes` values (column -> values, first
+        # axis slowest), everything else fixed at `record`. Axes the model
+        # does not use are left out of the matrix, which repeats rows instead.
+        X = np.repeat(self.transform_record(record), np.prod([len(values) for values in axes.values()]), axis=0)
+        grids = np.meshgrid(*(np.asarray(values, dtype=object) for values in axes.values()), indexing='ij')
+        for column, grid in zip(axes, grids):
+            i = self.positions.get(column)
+            if i is not None:
+                X[:, i] = self._encode(i, column, grid.ravel())
+        return X
+
+
+# Model Training
+class TrainedModel(NamedTuple):
+    model: object               # LinearRegression, or LinearModel when loaded from an artifact
+    pipeline: FeaturePipeline
+    data_hash: str
+    metrics: dict = None        # held-out error, see regression_metrics; not saved in the artifact
+
+    @property
+    def feature_columns(self):
+        return self.pipeline.feature_columns
+
+    @property
+    def label_encoders(self):
+        return self.pipeline.label_encoders
+
+# Error of predictions against true final grades, as plain floats so it can
+# go straight into registry.json. pass_accuracy is how often the prediction
+# lands on the right side of PASS_MARK.
+def regression_metrics(y_true, y_pred):
+    y_true = np.asarray(y_true, dtype=np.float64)
+    errors = np.asarray(y_pred, dtype=np.float64) - y_true
+    total = ((y_true - y_true.mean()) ** 2).sum()
+    return {
+        'rmse': float(np.sqrt((errors ** 2).mean())),
+        'mae': float(np.abs(errors).mean()),
+        'r2': float(1 - (errors ** 2).sum() / total) if total else 0.0,
+        'pass_accuracy': float(((y_true >= PASS_MARK) == (y_true + errors >= PASS_MARK)).mean()),
+    }
+
+def train_model(data, data_hash=None):
+    from sklearn.linear_model import LinearRegression
+    from sklearn.model_selection import train_test_split
+
+    with stage('preprocess'):
+        features, label_encoders = preprocess_data(data)
+        target = features.pop(TARGET)
+        pipeline = FeaturePipeline.fit(features, label_encoders)
+    # Fitted on a plain array, matching what the pipeline produces at predict time
+    X_train, X_test, y_train, y_test = train_test_split(features.to_numpy(dtype=np.float64), target.to_numpy(),
+                                                        test_size=0.2, random_state=42)
+    model = LinearRegression()
+    with stage('train'):
+        model.fit(X_train, y_train)
+    metrics = dict(regression_metrics(y_test, model.predict(X_test)), evaluation='holdout 20%',
+                   estimator='LinearRegression', features='all')
+    if data_hash is None:
+        data_hash = dataset_hash(data)
+    return TrainedModel(model, pipeline, data_hash, metrics)
+
+
+# Model Artifacts
+# Stored as plain arrays in an .npz so scoring processes can load a model
+# without unpickling anything or importing scikit-learn.
+class LinearModel:
+    def __init__(self, coef, intercept):
+        self.coef_ = np.asarray(coef, dtype=np.float64)
+        self.intercept_ = float(intercept)
+
+    def predict(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercept_
+
+def save_artifact(trained, path):
+    arrays = {
+        'coef': np.asarray(trained.model.coef_, dtype=np.float64),
+        'intercept': np.float64(trained.model.intercept_),
+        'feature_columns': np.asarray(trained.feature_columns, dtype=str),
+        'defaults': trained.pipeline.defaults,
+        'data_hash': np.asarray(trained.data_hash or '', dtype=str),
+    }
+    for column, encoder in trained.label_encoders.items():
+        arrays['classes__' + column] = np.asarray(encoder.classes_, dtype=str)
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+
+def load_artifact(path):
+    with np.load(path, allow_pickle=False) as arrays:
+        label_encoders = {name[len('classes__'):]: ClassEncoder(arrays[name])
+                          for name in arrays.files if name.startswith('classes__')}
+        defaults = arrays['defaults'] if 'defaults' in arrays.files else None
+        pipeline = FeaturePipeline(arrays['feature_columns'].tolist(), label_encoders, defaults)
+        return TrainedModel(LinearModel(arrays['coef'], arrays['intercept']), pipeline, str(arrays['data_hash']))
+
+
+# Prediction
+def form_to_record(gender, age, medu, fedu, pstatus, term_1, term_2, activities, internet, absences):
+    # Maps the Prediction page's form answers to raw values as they appear in
+    # students.csv; the pipeline encodes them exactly like the training data.
+    # Columns the form does not ask for (famsize, studytime, ...) get training
+    # defaults, and fields the model was not trained on (activities) are ignored.
+    return {
+        'gender': 'F' if gender == "Female" else 'M',
+        'age': age,
+        'Medu': EDUCATION_LEVELS.index(medu),
+        'Fedu': EDUCATION_LEVELS.index(fedu),
+        'Pstatus': 'T' if pstatus == "Together" else 'A',
+        'Term_1': term_1,
+        'Term_2': term_2,
+        'activities': 'yes' if activities == "Yes" else 'no',
+        'internet': 'yes' if internet == "Yes" else 'no',
+        'absences': absences
+    }
+
+def predict_record(record, trained):
+    return trained.model.predict(trained.pipeline.transform_record(record))[0]
+
+def predict_grid(record, trained, axes):
+    # What-if sweep: one predict call for the whole grid, shaped like the axes
+    X = trained.pipeline.transform_grid(record, axes)
+    return trained.model.predict(X).reshape([len(values) for values in axes.values()])
+
+def grade_band(predictions):
+    return np.select([predictions < PASS_MARK, predictions < TOP_MARK],
+                     ['Below Passing', 'Average'], 'Excellent')
+
+def predict_batch(frame, trained):
+    with stage('predict.batch'):
+        predictions = np.round(trained.model.predict(trained.pipeline.transform(frame))).astype(int)
+    return frame.assign(Predicted_Grade=predictions, Performance=grade_band(predictions))
+
+# Reads and scores `chunksize` rows at a time so large files never sit in memory whole
+def score_csv(source, trained, chunksize=BATCH_CHUNK_ROWS):
+    for chunk in pd.read_csv(source, chunksize=chunksize):
+        yield predict_batch(chunk, trained)
+
+def score_file(source, destination, trained, chunksize=BATCH_CHUNK_ROWS):
+    rows = 0
+    for i, scored in enumerate(score_csv(source, trained, chunksize)):
+        scored.to_csv(destination, mode='w' if i == 0 else 'a', header=(i == 0), index=False)
+        rows += len(scored)
+    return rows
@@ -0,0 +1,100 @@
+# Incremental least-squares training.
+# Keeps the sufficient statistics of the regression (XᵀX, Xᵀy, row count and
+# per-level counts of the encoded columns), so appending rows costs O(new rows)
+# and the coefficients are re-solved from a (features+1)² system. Unlike
+# engine.train_model there is no hold-out split: every row seen is used.
+import numpy as np
+
+from engine import TARGET, ClassEncoder, DatasetHasher, FeaturePipeline, LinearModel, TrainedModel, preprocess_data
+
+
+class IncrementalStats:
+    def __init__(self, feature_columns, label_encoders):
+        self.pipeline = FeaturePipeline(feature_columns, label_encoders)
+        self.feature_columns = self.pipeline.feature_columns
+        self.label_encoders = label_encoders
+        size = len(self.feature_columns) + 1  # last row/column is the intercept
+        self.xtx = np.zeros((size, size))
+        self.xty = np.zeros(size)
+        self.yty = 0.0
+        self.rows = 0
+        self.level_counts = {column: np.zeros(len(encoder.classes_), dtype=np.int64)
+                             for column, encoder in label_encoders.items()}
+        self.hasher = DatasetHasher()
+
+    @classmethod
+    def fit(cls, data):
+        # Encoders are fixed from this first batch; later rows must use the same levels
+        _, label_encoders = preprocess_data(data)
+        feature_columns = [column for column in data.columns if column != TARGET]
+        return cls(feature_columns, label_encoders).partial_fit(data)
+
+    def partial_fit(self, frame):
+        X = np.empty((len(frame), len(self.feature_columns) + 1))
+        X[:, :-1] = self.pipeline.transform(frame)
+        X[:, -1] = 1.0
+        y = frame[TARGET].to_numpy(dtype=np.float64)
+
+        self.xtx += X.T @ X
+        self.xty += X.T @ y
+        self.yty += y @ y
+        self.rows += len(frame)
+        for column, counts in self.level_counts.items():
+            codes = X[:, self.pipeline.positions[column]].astype(np.int64)
+            counts += np.bincount(codes, minlength=len(counts))
+        self.hasher.update(frame)
+        return self
+
+    def fit_stream(self, chunks):
+        for chunk in chunks:
+            self.partial_fit(chunk)
+        return self
+
+    def model(self):
+        # lstsq rather than solve so collinear features (e.g. a constant
+        # column in a small batch) still give the minimum-norm solution
+        beta = np.linalg.lstsq(self.xtx, self.xty, rcond=None)[0]
+        return LinearModel(beta[:-1], beta[-1])
+
+    def defaults(self):
+        # Same defaults as FeaturePipeline.fit: the mean (read off the
+        # intercept row of XᵀX) or the most common level
+        means = self.xtx[-1, :-1] / max(self.rows, 1)
+        return np.array([self.level_counts[column].argmax() if column in self.level_counts else means[i]
+                         for i, column in enumerate(self.feature_columns)], dtype=np.float64)
+
+    def to_trained(self):
+        pipeline = FeaturePipeline(self.feature_columns, self.label_encoders, self.defaults())
+        return TrainedModel(self.model(), pipeline, self.hasher.hexdigest())
+
+    def save(self, path):
+        arrays = {
+            'feature_columns': np.asarray(self.feature_columns, dtype=str),
+            'xtx': self.xtx,
+            'xty': self.xty,
+            'yty': np.float64(self.yty),
+            'rows': np.int64(self.rows),
+            'hash_state': np.frombuffer(self.hasher.state, dtype=np.uint8),
+            'hash_pending': np.frombuffer(self.hasher.pending, dtype=np.uint8),
+        }
+        for column, encoder in self.label_encoders.items():
+            arrays['classes__' + column] = np.asarray(encoder.classes_, dtype=str)
+            arrays['counts__' + column] = self.level_counts[column]
+        with open(path, 'wb') as f:
+            np.savez(f, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as arrays:
+            label_encoders = {name[len('classes__'):]: ClassEncoder(arrays[name])
+                              for name in arrays.files if name.startswith('classes__')}
+            stats = cls(arrays['feature_columns'].tolist(), label_encoders)
+            stats.xtx = arrays['xtx']
+            stats.xty = arrays['xty']
+            stats.yty = float(arrays['yty'])
+            stats.rows = int(arrays['rows'])
+            for column in label_encoders:
+                stats.level_counts[column] = arrays['counts__' + column]
+            stats.hasher = DatasetHasher(arrays['hash_state'].tobytes(), stats.rows,
+                                         arrays['hash_pending'].tobytes())
+        return stats
@@ -0,0 +1,87 @@
+# Streaming ingestion for exports too large to load whole.
+# The CSV goes through a generator pipeline, read -> validate -> aggregate,
+# BATCH_CHUNK_ROWS rows at a time, and only running aggregates are kept: the
+# per-term grade histograms (every Dashboard card and Analysis term chart is
+# derived from them), gender and age counts, and the regression's sufficient
+# statistics, from which the model is solved without a second pass, plus the
+# per-column FeatureSketch that later data is checked for drift against. Memory
+# stays at one chunk plus a few small arrays, however long the file is.
+import os
+
+import numpy as np
+import pandas as pd
+
+from datasource import CSV_DTYPES, read_csv
+from drift import FeatureSketch
+from engine import BATCH_CHUNK_ROWS, PASS_MARK, TOP_MARK
+from incremental import IncrementalStats
+from stats import MAX_GRADE, TERM_COLUMNS, category_counts, demographics_from_counts, grade_counts, term_stats_from_counts
+
+
+def read_chunks(path, chunksize=BATCH_CHUNK_ROWS):
+    # Yields (chunk, fraction of the file read so far)
+    size = os.path.getsize(path) or 1
+    with open(path, 'rb') as f:
+        for chunk in read_csv(f, chunksize=chunksize):
+            yield chunk, min(f.tell() / size, 1.0)
+
+def validate_chunks(chunks, start_row=0):
+    # Types are already enforced by the CSV_DTYPES parse; this checks columns and grade ranges
+    for chunk, progress in chunks:
+        missing = [column for column in CSV_DTYPES if column not in chunk.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {missing}")
+        grades = chunk[TERM_COLUMNS].to_numpy()
+        bad = (grades < 0) | (grades > MAX_GRADE)
+        if bad.any():
+            row = start_row + int(np.flatnonzero(bad.any(axis=1))[0])
+            raise ValueError(f"Grade outside 0-{MAX_GRADE} in data row {row + 1}")
+        start_row += len(chunk)
+        yield chunk, progress
+
+
+class StreamingAggregates:
+    def __init__(self):
+        self.rows = 0
+        self.grade_counts = np.zeros((len(TERM_COLUMNS), MAX_GRADE + 1), dtype=np.int64)
+        self.gender_counts = pd.Series(dtype=np.int64)
+        self.age_counts = pd.Series(dtype=np.int64)
+        self.stats = None  # IncrementalStats, with encoders fixed by the first chunk
+        self.sketch = FeatureSketch()
+
+    @property
+    def data_hash(self):
+        # Same as engine.dataset_hash of the whole table
+        return self.stats.hasher.hexdigest()
+
+    def update(self, chunk):
+        self.rows += len(chunk)
+        self.grade_counts += grade_counts(chunk)
+        self.gender_counts = self.gender_counts.add(category_counts(chunk['gender']), fill_value=0)
+        self.age_counts = self.age_counts.add(chunk['age'].value_counts(), fill_value=0)
+        self.sketch.update(chunk)
+        if self.stats is None:
+            self.stats = IncrementalStats.fit(chunk)
+        else:
+            self.stats.partial_fit(chunk)
+        return self
+
+    def term_stats(self, pass_mark=PASS_MARK, top_mark=TOP_MARK):
+        return term_stats_from_counts(self.grade_counts, pass_mark, top_mark)
+
+    def demographics(self):
+        ages = self.age_counts.astype(np.int64)
+        ages = ages.reindex(np.arange(ages.index.min(), ages.index.max() + 1), fill_value=0)
+        age_bins = pd.DataFrame({'start': ages.index, 'width': 1, 'center': ages.index, 'count': ages.values})
+        return demographics_from_counts(self.gender_counts.astype(np.int64), age_bins)
+
+def ingest_csv(path, chunksize=BATCH_CHUNK_ROWS, on_progress=None):
+    # on_progress(fraction, rows) is called after every chunk
+    aggregates = StreamingAggregates()
+    for chunk, progress in validate_chunks(read_chunks(path, chunksize)):
+        aggregates.update(chunk)
+        if on_progress is not None:
+            on_progress(progress, aggregates.rows)
+    if aggregates.stats is None:
+        raise ValueError(f"No student rows in {path}")
+    return aggregates
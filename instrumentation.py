@@ -0,0 +1,217 @@
+# Timing, memory and cache instrumentation for the hot paths.
+# Wrap a stage in `with stage('train'):` (or `timed('chart.box', func, ...)`)
+# and it is recorded twice: into the process-wide METRICS (what /metrics and
+# the 📈 Diagnostics page show) and into the current Rerun, if one was started
+# on this thread, which ends as one JSON log line:
+#   {"event": "rerun", "page": "...", "total_ms": 41.2, "stages": {...}, "cache": {...}}
+# Memory is the process's peak RSS per rerun; set STUDENT_TRACE_MEMORY=1 to
+# also trace the bytes each stage leaves allocated (slower).
+# Standard library only, so the headless engine can use it too.
+import contextvars
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LOGGER = logging.getLogger('student_perf')
+if not LOGGER.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter('%(asctime)s %(name)s %(message)s'))
+    LOGGER.addHandler(_handler)
+    LOGGER.setLevel(logging.INFO)
+    LOGGER.propagate = False
+
+if os.environ.get('STUDENT_TRACE_MEMORY', '').lower() in {'1', 'true', 'yes', 'on'} and not tracemalloc.is_tracing():
+    tracemalloc.start()
+
+
+def peak_rss_mib():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 2**20
+
+
+class Metrics:
+    # Process-wide totals, shared by every session and server thread
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages = {}   # name -> [count, total seconds, max seconds]
+        self.caches = {}   # name -> [calls, misses]
+        self.reruns = 0
+        self.collectors = {}  # name -> callable returning {'hits': n, 'misses': n}, e.g. CachedPredictor.info
+
+    def observe(self, name, seconds):
+        with self._lock:
+            entry = self.stages.setdefault(name, [0, 0.0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+
+    def cache_call(self, name, miss):
+        with self._lock:
+            entry = self.caches.setdefault(name, [0, 0])
+            entry[0] += 1
+            entry[1] += bool(miss)
+
+    def stage_table(self):
+        with self._lock:
+            return [{'stage': name, 'count': count, 'mean_ms': total / count * 1000, 'max_ms': peak * 1000,
+                     'total_s': total}
+                    for name, (count, total, peak) in sorted(self.stages.items())]
+
+    def cache_table(self):
+        with self._lock:
+            rows = [(name, calls - misses, misses) for name, (calls, misses) in sorted(self.caches.items())]
+            collectors = list(self.collectors.items())
+        for name, collect in collectors:
+            info = collect()
+            rows.append((name, info['hits'], info['misses']))
+        return [{'cache': name, 'hits': hits, 'misses': misses,
+                 'hit_rate': hits / (hits + misses) if hits + misses else None}
+                for name, hits, misses in rows]
+
+    def prometheus_text(self):
+        lines = [
+            '# HELP student_stage_seconds Time spent per instrumented stage.',
+            '# TYPE student_stage_seconds summary',
+        ]
+        for row in self.stage_table():
+            lines.append(f'student_stage_seconds_sum{{stage="{row["stage"]}"}} {row["total_s"]:.6f}')
+            lines.append(f'student_stage_seconds_count{{stage="{row["stage"]}"}} {row["count"]}')
+        lines += ['# HELP student_cache_requests_total Cache lookups by result.',
+                  '# TYPE student_cache_requests_total counter']
+        for row in self.cache_table():
+            lines.append(f'student_cache_requests_total{{cache="{row["cache"]}",result="hit"}} {row["hits"]}')
+            lines.append(f'student_cache_requests_total{{cache="{row["cache"]}",result="miss"}} {row["misses"]}')
+        lines += ['# TYPE student_reruns_total counter', f'student_reruns_total {self.reruns}']
+        rss = peak_rss_mib()
+        if rss is not None:
+            lines += ['# TYPE student_peak_rss_bytes gauge', f'student_peak_rss_bytes {int(rss * 2**20)}']
+        return '\n'.join(lines) + '\n'
+
+METRICS = Metrics()
+
+
+class Rerun:
+    # Stages and cache results of one script run (or one request)
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.allocated = {}
+        self.caches = {}
+        self._mark = None
+
+    def _add(self, name, seconds):
+        METRICS.observe(name, seconds)
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def mark(self, name):
+        # Open-ended stage, for spans too long to indent under `with stage()`:
+        # runs until the next mark() or finish()
+        now = time.perf_counter()
+        if self._mark is not None:
+            self._add(self._mark[0], now - self._mark[1])
+        self._mark = (name, now) if name else None
+
+    def finish(self, **fields):
+        self.mark(None)
+        total = time.perf_counter() - self.start
+        with METRICS._lock:
+            METRICS.reruns += 1
+        record = {
+            'event': 'rerun',
+            **fields,
+            'total_ms': round(total * 1000, 2),
+            'stages': {name: round(seconds * 1000, 2) for name, seconds in self.stages.items()},
+            'cache': self.caches,
+            'peak_rss_mib': round(peak_rss_mib() or 0, 1),
+        }
+        if self.allocated:
+            record['allocated_kib'] = {name: round(size / 1024, 1) for name, size in self.allocated.items()}
+        LOGGER.info(json.dumps(record, ensure_ascii=False))
+        _current.set(None)
+        return record
+
+_current = contextvars.ContextVar('rerun', default=None)
+_cache_misses = contextvars.ContextVar('cache_misses', default=None)
+
+def start_rerun():
+    rerun = Rerun()
+    _current.set(rerun)
+    return rerun
+
+@contextmanager
+def stage(name):
+    tracing = tracemalloc.is_tracing()
+    allocated = tracemalloc.get_traced_memory()[0] if tracing else 0
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - start
+        rerun = _current.get()
+        if rerun is None:
+            METRICS.observe(name, seconds)
+        else:
+            rerun._add(name, seconds)
+            if tracing:
+                rerun.allocated[name] = tracemalloc.get_traced_memory()[0] - allocated
+
+def timed(name, func, *args, **kwargs):
+    with stage(name):
+        return func(*args, **kwargs)
+
+def cache_miss():
+    # Call first thing inside a cached function's body: it only runs on a miss
+    misses = _cache_misses.get()
+    if misses is not None:
+        misses.append(True)
+
+def cached_call(name, func, *args, **kwargs):
+    # Times a call to a cached function and records whether it hit
+    misses = []
+    token = _cache_misses.set(misses)
+    try:
+        with stage(name):
+            result = func(*args, **kwargs)
+    finally:
+        _cache_misses.reset(token)
+    METRICS.cache_call(name, misses)
+    rerun = _current.get()
+    if rerun is not None:
+        rerun.caches[name] = 'miss' if misses else 'hit'
+    return result
+
+
+# Optional Prometheus scrape endpoint for processes without their own server
+def make_metrics_server(host='127.0.0.1', port=9464):
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path != '/metrics':
+                self.send_error(404)
+                return
+            body = METRICS.prometheus_text().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return ThreadingHTTPServer((host, port), MetricsHandler)
+
+def start_metrics_server(host='127.0.0.1', port=9464):
+    server = make_metrics_server(host, port)
+    threading.Thread(target=server.serve_forever, daemon=True, name='metrics-server').start()
+    return server
@@ -0,0 +1,105 @@
+# Single-student predictions for many concurrent callers (the Prediction form,
+# the HTTP endpoint). Answers are kept in an LRU cache keyed on the record's
+# values for the model's features, with blanks normalized, so a field the
+# model ignores doesn't split entries. Misses that arrive together are scored
+# in one vectorized predict call: when other misses are in flight, the first
+# caller waits up to BATCH_WINDOW_SECONDS (or until MAX_BATCH_ROWS are queued),
+# then scores everyone's rows and hands each caller its result. A lone miss is
+# scored straight away.
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import numpy as np
+import pandas as pd
+
+PREDICTION_CACHE_SIZE = 65_536
+BATCH_WINDOW_SECONDS = 0.002
+MAX_BATCH_ROWS = 1_024
+
+
+class CachedPredictor:
+    def __init__(self, trained, maxsize=PREDICTION_CACHE_SIZE, window=BATCH_WINDOW_SECONDS,
+                 max_batch=MAX_BATCH_ROWS):
+        self.trained = trained
+        self.maxsize = maxsize
+        self.window = window
+        self.max_batch = max_batch
+        self._cache = OrderedDict()
+        self._pending = {}  # key -> (encoded row, Future) for the next batch
+        self._batch_full = threading.Event()
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+        self.batched_rows = 0
+
+    def _key(self, record):
+        return tuple(None if pd.isna(value) else value
+                     for value in map(record.get, self.trained.feature_columns))
+
+    def predict(self, record):
+        key = self._key(record)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+            self._in_flight += 1
+        try:
+            return self._predict_miss(key, record)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _predict_miss(self, key, record):
+        row = self.trained.pipeline.transform_record(record)[0]
+        with self._lock:
+            if key in self._pending:
+                # Same input already queued: wait for that row's answer
+                future, leader = self._pending[key][1], False
+            else:
+                future, leader = Future(), not self._pending
+                self._pending[key] = (row, future)
+                if len(self._pending) >= self.max_batch:
+                    self._batch_full.set()
+            concurrent = self._in_flight > 1
+        if leader:
+            if concurrent:
+                self._batch_full.wait(self.window)
+            self._run_batch()
+        return future.result()
+
+    def _run_batch(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._batch_full.clear()
+        keys = list(pending)
+        try:
+            predictions = self.trained.model.predict(np.vstack([pending[key][0] for key in keys]))
+        except Exception as e:
+            for key in keys:
+                pending[key][1].set_exception(e)
+            return
+        with self._lock:
+            self.batches += 1
+            self.batched_rows += len(keys)
+            for key, prediction in zip(keys, predictions):
+                self._cache[key] = float(prediction)
+            while len(self._cache) > self.maxsize:
+                self._cache.popitem(last=False)
+        for key, prediction in zip(keys, predictions):
+            pending[key][1].set_result(float(prediction))
+
+    def info(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._cache),
+                'maxsize': self.maxsize,
+                'batches': self.batches,
+                'batched_rows': self.batched_rows,
+            }
@@ -0,0 +1,69 @@
+# Per-student ranking index behind the Rankings page.
+# Built once per data version: the predicted final grade of every row, from
+# one vectorized pass (chunked, so the float64 model matrix never holds more
+# than BATCH_CHUNK_ROWS rows), and an argsort order of each term-to-term grade
+# change. A top-N query then costs
+#   by predicted grade: argpartition over the rows, O(n), then sorting only N;
+#   by grade change:    the first N entries of the presorted order, O(N)
+#                       (O(n) when a cohort mask has to be applied).
+import numpy as np
+
+from engine import BATCH_CHUNK_ROWS
+
+# key -> (before, after) term columns
+CHANGES = {
+    'term_1_to_2': ('Term_1', 'Term_2'),
+    'term_2_to_3': ('Term_2', 'Term_3'),
+    'term_1_to_3': ('Term_1', 'Term_3'),
+}
+
+
+class RankingIndex:
+    def __init__(self, data, trained, chunksize=BATCH_CHUNK_ROWS):
+        self.rows = len(data)
+        self.predicted = np.empty(self.rows, dtype=np.float32)
+        for start in range(0, self.rows, chunksize):
+            chunk = data.iloc[start:start + chunksize]
+            self.predicted[start:start + len(chunk)] = trained.model.predict(trained.pipeline.transform(chunk))
+
+        self.changes = {}
+        self.orders = {}
+        for key, (before, after) in CHANGES.items():
+            change = data[after].to_numpy(dtype=np.int8) - data[before].to_numpy(dtype=np.int8)
+            self.changes[key] = change
+            self.orders[key] = np.argsort(change, kind='stable')  # biggest drop first
+
+    @property
+    def nbytes(self):
+        return self.predicted.nbytes + sum(array.nbytes for array in [*self.changes.values(), *self.orders.values()])
+
+    def values(self, key):
+        return self.predicted if key == 'predicted' else self.changes[key]
+
+    def top(self, key, n, rows=None, ascending=True):
+        # Row positions of the n lowest (or highest) values of `key`, in rank
+        # order; `rows` restricts the ranking to those positions (a cohort)
+        if key in self.orders:
+            order = self.orders[key] if ascending else self.orders[key][::-1]
+            if rows is not None:
+                selected = np.zeros(self.rows, dtype=bool)
+                selected[rows] = True
+                order = order[selected[order]]
+            return order[:n]
+
+        values = self.predicted if ascending else -self.predicted
+        if rows is None:
+            candidates = np.argpartition(values, n)[:n] if n < self.rows else np.arange(self.rows)
+        else:
+            candidates = np.asarray(rows)
+            if n < len(candidates):
+                candidates = candidates[np.argpartition(values[candidates], n)[:n]]
+        return candidates[np.argsort(values[candidates], kind='stable')]
+
+    def table(self, data, positions, key):
+        # The ranked students with their predicted grade and, for a change
+        # ranking, the change itself
+        ranked = data.iloc[positions].assign(Predicted_Grade=self.predicted[positions].round(1))
+        if key in self.changes:
+            ranked = ranked.assign(Change=self.changes[key][positions])
+        return ranked.rename_axis('Student')
@@ -0,0 +1,261 @@
+# Versioned model registry on disk.
+#   models/
+#     registry.json   index of versions + the currently active one
+#     v1.npz, v2.npz  artifacts written by engine.save_artifact
+#     v1.stats.npz    sufficient statistics for incremental updates (every
+#                     version but `selection` ones and their `reused` copies,
+#                     so those cannot be updated)
+#     v3.selection.csv  cross-validation leaderboard of a `cli.py select` run
+#     v1.sketch.npz   per-column value counts of the training data (drift.py)
+# Startup loads the active version whenever some version was registered for
+# the current data, even one trained on other rows; loading never moves
+# `current`, so a rollback sticks. When no version matches the data hash, the
+# data is first compared with the active version's training sketch: without
+# drift the model is kept (registered again for the new hash as a `reused`
+# version), and only drift or unseen levels retrain.
+# Several processes may share one registry (replicas starting on new data at
+# once): changes to the index happen under an exclusive lock on
+# models/registry.lock, and a process that waited for it finds the version
+# the first one trained instead of training again.
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows: the lock only serializes threads of this process
+    fcntl = None
+
+import pandas as pd
+
+from datasource import BASE_DIR
+from drift import DRIFT_THRESHOLD, FeatureSketch, compare
+from engine import load_artifact, save_artifact, train_model
+from incremental import IncrementalStats
+from selection import DEFAULT_FOLDS, select_model
+
+DEFAULT_REGISTRY_DIR = os.environ.get('STUDENT_MODEL_DIR', os.path.join(BASE_DIR, 'models'))
+
+# root -> [RLock, depth, lock file]: one flock per registry per process, so
+# nested and concurrent callers in this process share it
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+class ModelRegistry:
+    def __init__(self, root=DEFAULT_REGISTRY_DIR):
+        self.root = root
+        self.index_path = os.path.join(root, 'registry.json')
+        self.lock_path = os.path.join(root, 'registry.lock')
+
+    @contextmanager
+    def _locked(self):
+        with _locks_guard:
+            entry = _locks.setdefault(os.path.abspath(self.root), [threading.RLock(), 0, None])
+        with entry[0]:
+            if entry[1] == 0:
+                os.makedirs(self.root, exist_ok=True)
+                entry[2] = open(self.lock_path, 'a+b')
+                if fcntl is not None:
+                    fcntl.flock(entry[2], fcntl.LOCK_EX)  # released by the OS if this process dies
+            entry[1] += 1
+            try:
+                yield
+            finally:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    entry[2].close()  # closing releases the flock
+                    entry[2] = None
+
+    def _read_index(self):
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'current': None, 'versions': []}
+
+    def _write_index(self, index):
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix='registry-', suffix='.json.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(index, f, indent=2)
+            os.replace(tmp_path, self.index_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def _path(self, version):
+        return os.path.join(self.root, version + '.npz')
+
+    def _stats_path(self, version):
+        return os.path.join(self.root, version + '.stats.npz')
+
+    def _leaderboard_path(self, version):
+        return os.path.join(self.root, version + '.selection.csv')
+
+    def _sketch_path(self, version):
+        return os.path.join(self.root, version + '.sketch.npz')
+
+    def versions(self):
+        return self._read_index()['versions']
+
+    def current(self):
+        return self._read_index()['current']
+
+    def entry(self, version=None):
+        version = version or self.current()
+        for entry in self.versions():
+            if entry['version'] == version:
+                return entry
+        raise ValueError(f"Unknown model version: {version}")
+
+    def find(self, data_hash):
+        # Most recent version trained on exactly this data, if any
+        for entry in reversed(self.versions()):
+            if entry['data_hash'] == data_hash:
+                return entry['version']
+        return None
+
+    def register(self, trained, rows=None, activate=True, stats=None, method='full', leaderboard=None,
+                 sketch=None, drift=None):
+        with self._locked():
+            index = self._read_index()
+            version = f"v{len(index['versions']) + 1}"
+            os.makedirs(self.root, exist_ok=True)
+            save_artifact(trained, self._path(version))
+            if stats is not None:
+                stats.save(self._stats_path(version))
+            if leaderboard is not None:
+                leaderboard.to_csv(self._leaderboard_path(version), index=False)
+            if sketch is not None:
+                sketch.save(self._sketch_path(version))
+            entry = {
+                'version': version,
+                'data_hash': trained.data_hash,
+                'rows': rows,
+                'method': method,
+                'features': trained.feature_columns,
+                'metrics': trained.metrics,
+                'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            }
+            if drift is not None:
+                entry['drift'] = drift  # largest PSI against the previous version's training data
+            index['versions'].append(entry)
+            if activate:
+                index['current'] = version
+            self._write_index(index)
+            return version
+
+    def activate(self, version):
+        # Also how a rollback is done: point `current` at an earlier version
+        with self._locked():
+            index = self._read_index()
+            if version not in {entry['version'] for entry in index['versions']}:
+                raise ValueError(f"Unknown model version: {version}")
+            index['current'] = version
+            self._write_index(index)
+
+    def load(self, version=None):
+        version = version or self.current()
+        if version is None:
+            raise FileNotFoundError(f"No model registered in {self.root}")
+        # Metrics live in the index, not the artifact
+        return load_artifact(self._path(version))._replace(metrics=self.entry(version).get('metrics'))
+
+    def load_leaderboard(self, version=None):
+        version = version or self.current()
+        if version is None or not os.path.exists(self._leaderboard_path(version)):
+            return None
+        return pd.read_csv(self._leaderboard_path(version))
+
+    def load_stats(self, version=None):
+        version = version or self.current()
+        if version is None or not os.path.exists(self._stats_path(version)):
+            raise FileNotFoundError(f"No incremental statistics for model {version} in {self.root}; "
+                                    "selected models (and reused copies of them) can only be retrained")
+        return IncrementalStats.load(self._stats_path(version))
+
+    def load_sketch(self, version=None):
+        version = version or self.current()
+        if version is None or not os.path.exists(self._sketch_path(version)):
+            return None
+        return FeatureSketch.load(self._sketch_path(version))
+
+    def train(self, data, data_hash=None, activate=True, drift=None):
+        trained = train_model(data, data_hash)
+        stats = IncrementalStats.fit(data)
+        version = self.register(trained, rows=len(data), activate=activate, stats=stats,
+                                sketch=FeatureSketch().update(data), drift=drift)
+        return version, trained
+
+    def select(self, data, data_hash=None, activate=True, folds=DEFAULT_FOLDS, workers=None):
+        # No incremental statistics: they describe an ordinary least-squares
+        # fit on every feature, which the selected model need not be
+        trained, leaderboard = select_model(data, data_hash, folds, workers)
+        version = self.register(trained, rows=len(data), activate=activate, method='selection',
+                                leaderboard=leaderboard, sketch=FeatureSketch().update(data))
+        return version, trained, leaderboard
+
+    def update(self, chunks, version=None, activate=True):
+        # Appends rows to a version's statistics and registers the re-solved model
+        sketch = self.load_sketch(version)
+        if sketch is not None:
+            chunks = sketch.observe(chunks)
+        stats = self.load_stats(version).fit_stream(chunks)
+        trained = stats.to_trained()
+        new_version = self.register(trained, rows=stats.rows, activate=activate, stats=stats,
+                                    method='incremental', sketch=sketch)
+        return new_version, trained
+
+    def _load_matching(self, data_hash):
+        # The current version when this data has been registered before, even
+        # if current was trained on other data: a rollback (`activate`) or a
+        # retrain on extra rows outlasts the next start. None for new data.
+        version = self.find(data_hash)
+        if version is None:
+            return None
+        if self.current() is None:  # only ever registered without activating
+            self.activate(version)
+        return self.load()
+
+    def check_drift(self, sketch, version=None, threshold=DRIFT_THRESHOLD):
+        # DriftReport of new data against a version's training data, or None
+        # when there is no model or it was registered without a sketch
+        version = version or self.current()
+        reference = self.load_sketch(version)
+        if reference is None:
+            return None
+        return compare(reference, sketch, self.load(version).pipeline.label_encoders, threshold)
+
+    def load_or_train(self, data, data_hash, threshold=DRIFT_THRESHOLD):
+        with self._locked():
+            trained = self._load_matching(data_hash)
+            if trained is not None:
+                return trained
+            report = self.check_drift(FeatureSketch().update(data), threshold=threshold)
+            if report is None or report.retrain:
+                return self.train(data, data_hash, drift=None if report is None else report.max_psi)[1]
+            # Stable data: keep the model (and the sketch it is measured against).
+            # When the kept model is a least-squares fit, statistics are fitted on
+            # this data, whose hash the version carries, so `update` can append
+            # to it; a selected model has none to keep it from being replaced.
+            current = self.current()
+            trained = self.load(current)._replace(data_hash=data_hash)
+            stats = IncrementalStats.fit(data) if os.path.exists(self._stats_path(current)) else None
+            self.register(trained, rows=len(data), stats=stats, method='reused',
+                          sketch=self.load_sketch(current), drift=report.max_psi)
+            return trained
+
+    def load_or_register(self, stats, sketch=None):
+        # For streamed data: the model is solved from already accumulated
+        # statistics, so there is no retraining to save
+        with self._locked():
+            trained = self._load_matching(stats.hasher.hexdigest())
+            if trained is None:
+                trained = stats.to_trained()
+                self.register(trained, rows=stats.rows, stats=stats, method='streaming', sketch=sketch)
+            return trained
@@ -0,0 +1,266 @@
+# Static HTML reports of the 🏠 Dashboard and 📊 Analysis pages, rendered
+# headlessly for many schools and cohorts at once:
+#   python cli.py report -o reports --workers 8 --cohort "gender=F" --cohort "age=15,16"
+# One worker process per school loads its data once, computes the whole-school
+# aggregates once and builds the cohort cube once; each cohort's aggregates are
+# then sums over the cube. Figures come from charts.py and are built once per
+# distinct set of students (cohorts covering the same cube groups share them),
+# and plotly.js is written once per output directory instead of into every
+# page. The card markup is shared with the dashboard so both look the same.
+import html
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
+
+from charts import age_figure, gender_figure, grade_box_figure, grade_histogram_figure, pass_rate_figure, trend_figure
+from cohorts import CohortCube
+from datasource import load_tenants
+from engine import load_data
+from ingest import ingest_csv
+from stats import TERM_COLUMNS, TERM_LABELS, compute_demographics, compute_term_stats
+
+# (section, chart name, figure function, aggregates it is drawn from), in page order
+REPORT_CHARTS = [
+    ("📈 Performance Analysis", 'grade_box', grade_box_figure, 'term_stats'),
+    ("📈 Performance Analysis", 'trend', trend_figure, 'term_stats'),
+    ("📈 Performance Analysis", 'grade_histogram', grade_histogram_figure, 'term_stats'),
+    ("📈 Performance Analysis", 'pass_rate', pass_rate_figure, 'term_stats'),
+    ("👥 Demographics", 'gender', gender_figure, 'demographics'),
+    ("👥 Demographics", 'age', age_figure, 'demographics'),
+]
+
+TERM_CARD_COLORS = ['#3498db', '#2ecc71', '#9b59b6']
+PLOTLYJS_MODES = ['directory', 'cdn', 'inline']
+
+
+# Dashboard Cards
+def summary_values(term_stats):
+    # (label, value, background) of the four Overall Performance Summary cards
+    stats = term_stats.summary
+    return [
+        ("Total Students", stats.loc['Term_3', 'count'], '#2ecc71'),
+        ("Overall Average", round(stats['mean'].mean(), 1), '#3498db'),
+        ("Passed Students", stats.loc['Term_3', 'count'] - stats.loc['Term_3', 'fail_count'], '#e74c3c'),
+        ("Top Performers", stats.loc['Term_3', 'top_count'], '#f1c40f'),
+    ]
+
+def summary_card_html(label, value, color):
+    return """
+        <div style='background-color: {}; padding: 20px; border-radius: 10px; color: white'>
+            <h1 style='text-align: center; font-size: 24px;'>{}</h1>
+            <p style='text-align: center; font-size: 16px; margin: 0;'>{}</p>
+        </div>
+        """.format(color, value, label)
+
+def term_card_html(term_stats, term):
+    stats = term_stats.summary
+    i = TERM_COLUMNS.index(term)
+    return """
+        <div style='background-color: #f8f9fa; padding: 20px; border-radius: 10px; border: 2px solid #e0e0e0'>
+            <h3 style='text-align: center; color: {}; margin-bottom: 15px;'>{}</h3>
+            <div style='display: grid; grid-template-columns: 1fr; gap: 10px;'>
+                <div style='background-color: white; padding: 10px; border-radius: 5px; text-align: center;'>
+                    <p style='margin: 0; color: #666;'>Average Grade</p>
+                    <h2 style='margin: 5px 0; color: #2c3e50;'>{}</h2>
+                </div>
+                <div style='background-color: white; padding: 10px; border-radius: 5px; text-align: center;'>
+                    <p style='margin: 0; color: #666;'>Pass Rate</p>
+                    <h2 style='margin: 5px 0; color: #2c3e50;'>{}%</h2>
+                </div>
+                <div style='background-color: white; padding: 10px; border-radius: 5px; text-align: center;'>
+                    <p style='margin: 0; color: #666;'>Failed Students</p>
+                    <h2 style='margin: 5px 0; color: #e74c3c;'>{}</h2>
+                </div>
+                <div style='background-color: white; padding: 10px; border-radius: 5px; text-align: center;'>
+                    <p style='margin: 0; color: #666;'>Top Performers</p>
+                    <h2 style='margin: 5px 0; color: #f1c40f;'>{}</h2>
+                </div>
+            </div>
+        </div>
+        """.format(
+            TERM_CARD_COLORS[i], TERM_LABELS[i],
+            round(stats.loc[term, 'mean'], 1),
+            round(stats.loc[term, 'pass_rate'], 1),
+            stats.loc[term, 'fail_count'],
+            stats.loc[term, 'top_count'])
+
+
+# Cohorts
+def parse_cohort(text):
+    # "gender=F;age=15,16" -> {'gender': ['F'], 'age': ['15', '16']}
+    filters = {}
+    for part in filter(None, (part.strip() for part in text.split(';'))):
+        column, sep, values = part.partition('=')
+        if not sep or not values.strip():
+            raise ValueError(f"Bad cohort filter {part!r}; expected column=value[,value...]")
+        filters[column.strip()] = [value.strip() for value in values.split(',')]
+    return filters
+
+def _cube_filters(cube, filters):
+    # Matches the command line's strings against the cube's typed levels;
+    # None when a column matches none of them (an empty list would mean "any")
+    resolved = {}
+    for column, values in filters.items():
+        if column not in cube.columns:
+            raise ValueError(f"Cannot filter on {column!r}; cohort columns are {cube.columns}")
+        resolved[column] = [level for level in cube.options(column) if str(level) in values]
+        if not resolved[column]:
+            return None
+    return resolved
+
+def cohort_label(filters):
+    return '; '.join(f"{column}={','.join(values)}" for column, values in filters.items())
+
+def report_filename(school, filters=None):
+    name = school if not filters else f"{school}--{cohort_label(filters)}"
+    return re.sub(r'[^\w.=,-]+', '_', name) + '.html'
+
+
+# Rendering
+def _figure_html(figure):
+    return figure.to_html(full_html=False, include_plotlyjs=False, default_width='100%',
+                          config={'displaylogo': False, 'responsive': True})
+
+def _plotlyjs_tag(mode):
+    from plotly.offline import get_plotlyjs, get_plotlyjs_version
+
+    if mode == 'inline':
+        return f"<script>{get_plotlyjs()}</script>"
+    if mode == 'cdn':
+        return f'<script src="https://cdn.plot.ly/plotly-{get_plotlyjs_version()}.min.js"></script>'
+    return '<script src="plotly.min.js"></script>'
+
+def chart_sections(term_stats, demographics):
+    aggregates = {'term_stats': term_stats, 'demographics': demographics}
+    sections = {}
+    for section, _, build, source in REPORT_CHARTS:
+        sections.setdefault(section, []).append(f"<div>{_figure_html(build(aggregates[source]))}</div>")
+    return ''.join(f"<h3>{section}</h3><div class='grid charts'>{''.join(figures)}</div>"
+                   for section, figures in sections.items())
+
+def render_report(title, subtitle, term_stats, demographics, plotlyjs='directory', charts=None):
+    # `charts` is chart_sections() output to reuse, when already built for the same aggregates
+    cards = ''.join(f"<div>{summary_card_html(*card)}</div>" for card in summary_values(term_stats))
+    terms = ''.join(f"<div>{term_card_html(term_stats, term)}</div>" for term in TERM_COLUMNS)
+    if charts is None:
+        charts = chart_sections(term_stats, demographics)
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+{_plotlyjs_tag(plotlyjs)}
+<style>
+    body {{ font-family: sans-serif; margin: 2rem auto; max-width: 1200px; color: #2c3e50; }}
+    .grid {{ display: grid; gap: 1rem; margin-bottom: 2rem; }}
+    .summary {{ grid-template-columns: repeat(4, 1fr); }}
+    .terms {{ grid-template-columns: repeat(3, 1fr); }}
+    .charts {{ grid-template-columns: repeat(2, 1fr); }}
+    .caption {{ color: #666; font-size: 14px; }}
+</style>
+</head>
+<body>
+<h1>🏠 {html.escape(title)}</h1>
+<p class="caption">{html.escape(subtitle)}</p>
+<h3>📊 Overall Performance Summary</h3>
+<div class="grid summary">{cards}</div>
+<h3>📝 Term-wise Performance</h3>
+<div class="grid terms">{terms}</div>
+{charts}
+</body>
+</html>
+"""
+
+
+# Batch
+def school_reports(school, config, cohorts, out_dir, plotlyjs='directory'):
+    # Writes the whole-school report and one per cohort; returns
+    # (filename, school, cohort label, students, seconds) per page
+    start = time.perf_counter()
+    generated = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M UTC')
+    if config.streaming and config.format == 'csv':
+        data = None
+        aggregates = ingest_csv(config.path)
+        term_stats, demographics = aggregates.term_stats(), aggregates.demographics()
+    else:
+        data, _ = load_data(config)
+        term_stats, demographics = compute_term_stats(data), compute_demographics(data)
+
+    # Pages keyed by the cube groups they cover, so cohorts that select the
+    # same students (or all of them) share aggregates and figures
+    pages = [(None, 'all')]
+    shared = {'all': (term_stats, demographics, None)}
+    if cohorts:
+        if data is None:
+            raise ValueError(f"{school}: cohort reports need the full table, not streaming mode")
+        cube = CohortCube(data)
+        everyone = cube.mask(None).tobytes()
+        for filters in cohorts:
+            resolved = _cube_filters(cube, filters)
+            if resolved is None or cube.size(resolved) == 0:
+                continue  # no students in this cohort at this school
+            key = cube.mask(resolved).tobytes()
+            key = 'all' if key == everyone else key
+            if key not in shared:
+                shared[key] = (cube.term_stats(resolved), cube.demographics(resolved), None)
+            pages.append((filters, key))
+
+    written = []
+    for filters, key in pages:
+        page_term_stats, page_demographics, charts = shared[key]
+        if charts is None:
+            charts = chart_sections(page_term_stats, page_demographics)
+            shared[key] = (page_term_stats, page_demographics, charts)
+        students = int(page_term_stats.summary.loc['Term_3', 'count'])
+        subtitle = f"{students:,} students" + (f" in cohort {cohort_label(filters)}" if filters else "")
+        page = render_report(f"{school} Student Performance", f"{subtitle}, generated {generated}",
+                             page_term_stats, page_demographics, plotlyjs, charts)
+        filename = report_filename(school, filters)
+        with open(os.path.join(out_dir, filename), 'w', encoding='utf-8') as f:
+            f.write(page)
+        written.append((filename, school, cohort_label(filters) if filters else '', students,
+                        time.perf_counter() - start))
+    return written
+
+def _write_index(out_dir, rows):
+    links = ''.join(
+        f"<tr><td><a href=\"{html.escape(filename)}\">{html.escape(school)}</a></td>"
+        f"<td>{html.escape(cohort)}</td><td>{students:,}</td></tr>"
+        for filename, school, cohort, students, _ in rows)
+    with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(f"""<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>Student Performance Reports</title></head>
+<body style="font-family: sans-serif">
+<h1>Student Performance Reports</h1>
+<table><tr><th>School</th><th>Cohort</th><th>Students</th></tr>{links}</table>
+</body></html>
+""")
+
+def export_reports(out_dir, tenants=None, cohorts=(), workers=None, plotlyjs='directory', on_done=None):
+    # One task per school on a process pool; on_done(rows) is called as each
+    # school finishes. Returns every page written, in school order.
+    tenants = tenants if tenants is not None else load_tenants()
+    if plotlyjs not in PLOTLYJS_MODES:
+        raise ValueError(f"plotlyjs must be one of {PLOTLYJS_MODES}")
+    os.makedirs(out_dir, exist_ok=True)
+    if plotlyjs == 'directory':
+        from plotly.offline import get_plotlyjs
+
+        with open(os.path.join(out_dir, 'plotly.min.js'), 'w', encoding='utf-8') as f:
+            f.write(get_plotlyjs())
+
+    cohorts = list(cohorts)
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(school_reports, school, config, cohorts, out_dir, plotlyjs): school
+                   for school, config in tenants.items()}
+        for future in as_completed(futures):
+            school = futures[future]
+            results[school] = future.result()
+            if on_done is not None:
+                on_done(results[school])
+    rows = [row for school in tenants for row in results[school]]
+    _write_index(out_dir, rows)
+    return rows
@@ -0,0 +1,112 @@
+# Offline model selection: every candidate regressor on every feature set,
+# scored by k-fold cross-validation with the fits spread over a process pool.
+#   python cli.py select [students.csv] --folds 5 --workers 8
+# The encoded matrix is written once to a temporary .npy and memory-mapped by
+# each worker, so starting a worker or a fit never pickles the table. Only
+# linear models are searched: the registry stores coefficients, not pickles.
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from engine import TARGET, FeaturePipeline, TrainedModel, dataset_hash, preprocess_data, regression_metrics
+
+DEFAULT_FOLDS = 5
+SEED = 42
+
+# name -> (scikit-learn class, parameters)
+CANDIDATES = {
+    'linear': ('LinearRegression', {}),
+    'ridge_1': ('Ridge', {'alpha': 1.0}),
+    'ridge_10': ('Ridge', {'alpha': 10.0}),
+    'lasso_0.1': ('Lasso', {'alpha': 0.1}),
+    'elasticnet_0.1': ('ElasticNet', {'alpha': 0.1, 'l1_ratio': 0.5}),
+    'huber': ('HuberRegressor', {'max_iter': 1000}),
+}
+
+# name -> columns left out; 'no_term_grades' is the early-warning model that
+# predicts before any term grade is known
+FEATURE_SETS = {
+    'all': [],
+    'no_term_1': ['Term_1'],
+    'no_term_grades': ['Term_1', 'Term_2'],
+    'no_family': ['famsize', 'Pstatus', 'Medu', 'Fedu', 'famrel'],
+}
+
+METRICS = ['rmse', 'mae', 'r2', 'pass_accuracy']
+
+
+def make_estimator(spec):
+    import sklearn.linear_model
+
+    class_name, params = spec
+    return getattr(sklearn.linear_model, class_name)(**params)
+
+def fold_ids(rows, folds, seed=SEED):
+    # Shuffled, balanced fold number per row
+    return np.random.default_rng(seed).permutation(rows) % folds
+
+
+# Worker side: the arrays are opened read-only once per process
+_shared = {}
+
+def _open_shared(directory):
+    for name in ('X', 'y', 'folds'):
+        _shared[name] = np.load(os.path.join(directory, name + '.npy'), mmap_mode='r')
+
+def _score_fold(spec, columns, fold):
+    X, y, folds = _shared['X'], _shared['y'], _shared['folds']
+    test = np.asarray(folds) == fold
+    model = make_estimator(spec)
+    model.fit(X[~test][:, columns], y[~test])
+    return regression_metrics(y[test], model.predict(X[test][:, columns]))
+
+
+def _feature_columns(features, dropped):
+    return [column for column in features.columns if column not in dropped]
+
+def cross_validate(features, target, folds=DEFAULT_FOLDS, workers=None,
+                   candidates=CANDIDATES, feature_sets=FEATURE_SETS):
+    # One row per (candidate, feature set): mean and std of each metric over the folds
+    tasks = []
+    for feature_set, dropped in feature_sets.items():
+        columns = [features.columns.get_loc(column) for column in _feature_columns(features, dropped)]
+        for candidate in candidates:
+            tasks.extend((candidate, feature_set, columns, fold) for fold in range(folds))
+
+    with tempfile.TemporaryDirectory(prefix='selection-') as directory:
+        np.save(os.path.join(directory, 'X.npy'), features.to_numpy(dtype=np.float64))
+        np.save(os.path.join(directory, 'y.npy'), target.to_numpy(dtype=np.float64))
+        np.save(os.path.join(directory, 'folds.npy'), fold_ids(len(target), folds))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_open_shared,
+                                 initargs=(directory,)) as pool:
+            futures = [pool.submit(_score_fold, candidates[candidate], columns, fold)
+                       for candidate, _, columns, fold in tasks]
+            results = [dict(future.result(), estimator=candidate, features=feature_set)
+                       for (candidate, feature_set, _, _), future in zip(tasks, futures)]
+
+    scores = pd.DataFrame(results).groupby(['estimator', 'features'], sort=False)[METRICS].agg(['mean', 'std'])
+    scores.columns = [f"{metric}_{stat}" if stat == 'std' else metric for metric, stat in scores.columns]
+    return scores.reset_index().sort_values('rmse', ignore_index=True)
+
+def select_model(data, data_hash=None, folds=DEFAULT_FOLDS, workers=None,
+                 candidates=CANDIDATES, feature_sets=FEATURE_SETS):
+    # Returns the best (lowest mean RMSE) candidate refitted on every row, and
+    # the full leaderboard
+    features, label_encoders = preprocess_data(data)
+    target = features.pop(TARGET)
+    leaderboard = cross_validate(features, target, folds, workers, candidates, feature_sets)
+    best = leaderboard.iloc[0]
+
+    columns = _feature_columns(features, feature_sets[best['features']])
+    label_encoders = {column: encoder for column, encoder in label_encoders.items() if column in columns}
+    pipeline = FeaturePipeline.fit(features[columns], label_encoders)
+    model = make_estimator(candidates[best['estimator']])
+    model.fit(features[columns].to_numpy(dtype=np.float64), target.to_numpy())
+    metrics = {key: float(best[key]) for key in leaderboard.columns if key not in ('estimator', 'features')}
+    metrics.update(evaluation=f"{folds}-fold cv", estimator=best['estimator'], features=best['features'])
+    if data_hash is None:
+        data_hash = dataset_hash(data)
+    return TrainedModel(model, pipeline, data_hash, metrics), leaderboard
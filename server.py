@@ -0,0 +1,81 @@
+# Minimal local HTTP scoring endpoint built on the standard library.
+#   GET  /health   -> {"status": "ok", "data_hash": ...}
+#   GET  /metrics  -> Prometheus text: stage timings and cache hit rates
+#   POST /predict  -> body is a JSON list of student records (same columns as
+#                     students.csv) or {"students": [...]}; returns one
+#                     {"Predicted_Grade", "Performance"} object per record.
+# Single-record requests go through a CachedPredictor, so concurrent lookups
+# share its cache and micro-batches; larger payloads are scored as a frame.
+# The listen backlog (STUDENT_SERVER_BACKLOG, default 128) is sized for
+# bursts of clients; the standard library's 5 resets connections under load.
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from engine import grade_band, predict_batch
+from instrumentation import METRICS, stage
+from predictor import CachedPredictor
+
+DEFAULT_BACKLOG = int(os.environ.get('STUDENT_SERVER_BACKLOG', 128))
+
+
+def make_handler(trained):
+    predictor = CachedPredictor(trained)
+    METRICS.collectors['server.prediction'] = predictor.info
+
+    class ScoringHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, {'status': 'ok', 'data_hash': trained.data_hash})
+            elif self.path == '/metrics':
+                body = METRICS.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.path != '/predict':
+                self._send_json(404, {'error': 'not found'})
+                return
+            try:
+                length = int(self.headers.get('Content-Length', 0))
+                payload = json.loads(self.rfile.read(length) or b'[]')
+                records = payload['students'] if isinstance(payload, dict) else payload
+                if len(records) == 1:
+                    with stage('predict'):
+                        grade = round(predictor.predict(records[0]))
+                    predictions = [{'Predicted_Grade': grade, 'Performance': str(grade_band(grade))}]
+                else:
+                    scored = predict_batch(pd.DataFrame.from_records(records), trained)
+                    predictions = scored[['Predicted_Grade', 'Performance']].to_dict(orient='records')
+            except Exception as e:
+                self._send_json(400, {'error': str(e)})
+                return
+            self._send_json(200, {'predictions': predictions})
+
+        def log_message(self, format, *args):
+            pass
+
+    return ScoringHandler
+
+class ScoringServer(ThreadingHTTPServer):
+    def __init__(self, address, handler, backlog=DEFAULT_BACKLOG):
+        self.request_queue_size = backlog  # read by listen() while the base class binds
+        super().__init__(address, handler)
+
+def make_server(trained, host='127.0.0.1', port=8502, backlog=DEFAULT_BACKLOG):
+    return ScoringServer((host, port), make_handler(trained), backlog)
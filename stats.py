@@ -0,0 +1,114 @@
+# Aggregates behind the Dashboard cards and Analysis charts. Pure pandas/numpy,
+# so the dashboard, benchmarks and any headless job compute them the same way.
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from engine import PASS_MARK, TOP_MARK
+
+TERM_COLUMNS = ['Term_1', 'Term_2', 'Term_3']
+TERM_LABELS = ['Term 1', 'Term 2', 'Term 3']
+MAX_GRADE = 20
+
+
+class TermStats(NamedTuple):
+    summary: pd.DataFrame    # one row per term: mean, pass rate, counts, box plot stats
+    histogram: pd.DataFrame  # student count per integer grade, one column per term
+
+def _quantile_from_counts(values, cumulative, q):
+    # Linear-interpolated quantile (pandas' default) read off a histogram
+    n = cumulative[-1]
+    position = q * (n - 1)
+    lower = int(np.floor(position))
+    low_value = values[np.searchsorted(cumulative, lower, side='right')]
+    high_value = values[np.searchsorted(cumulative, min(lower + 1, n - 1), side='right')]
+    return low_value + (high_value - low_value) * (position - lower)
+
+def grade_counts(data):
+    # Students per integer grade, shape (terms, grades), in one bincount
+    grades = data[TERM_COLUMNS].to_numpy(dtype=np.int64)
+    width = max(MAX_GRADE, int(grades.max())) + 1
+    offsets = np.arange(len(TERM_COLUMNS)) * width
+    counts = np.bincount((grades + offsets).ravel(), minlength=width * len(TERM_COLUMNS))
+    return counts.reshape(len(TERM_COLUMNS), width)
+
+# Grades are integers, so a single bincount over all three terms holds
+# everything the cards and charts need; the rest is arithmetic on <= 21 bins.
+def compute_term_stats(data, pass_mark=PASS_MARK, top_mark=TOP_MARK):
+    return term_stats_from_counts(grade_counts(data), pass_mark, top_mark)
+
+def term_stats_from_counts(counts, pass_mark=PASS_MARK, top_mark=TOP_MARK):
+    values = np.arange(counts.shape[1])
+
+    rows = []
+    for term_counts in counts:
+        n = term_counts.sum()
+        if n == 0:  # an empty cohort: counts of 0, no grades to summarise
+            rows.append({'count': 0, 'mean': np.nan, 'pass_rate': np.nan, 'fail_count': 0, 'top_count': 0,
+                         'min': np.nan, 'q1': np.nan, 'median': np.nan, 'q3': np.nan, 'max': np.nan,
+                         'lowerfence': np.nan, 'upperfence': np.nan})
+            continue
+        cumulative = np.cumsum(term_counts)
+        present = values[term_counts > 0]
+        q1, median, q3 = (_quantile_from_counts(values, cumulative, q) for q in (0.25, 0.5, 0.75))
+        iqr = q3 - q1
+        rows.append({
+            'count': n,
+            'mean': (term_counts * values).sum() / n,
+            'pass_rate': term_counts[pass_mark:].sum() / n * 100,
+            'fail_count': term_counts[:pass_mark].sum(),
+            'top_count': term_counts[top_mark:].sum(),
+            'min': present.min(),
+            'q1': q1,
+            'median': median,
+            'q3': q3,
+            'max': present.max(),
+            'lowerfence': present[present >= q1 - 1.5 * iqr].min(),
+            'upperfence': present[present <= q3 + 1.5 * iqr].max(),
+        })
+
+    summary = pd.DataFrame(rows, index=TERM_COLUMNS)
+    histogram = pd.DataFrame(counts.T, index=pd.Index(values, name='Grade'), columns=TERM_COLUMNS)
+    return TermStats(summary, histogram)
+
+
+# Demographics
+HISTOGRAM_MAX_BINS = 50
+GENDER_LABELS = {'F': 'Female', 'M': 'Male'}
+
+class DemographicStats(NamedTuple):
+    gender: pd.Series     # students per gender label
+    age: pd.DataFrame     # histogram bins: start, width, center, count
+
+def category_counts(values):
+    # Counts per level; categoricals count their codes, so no strings are compared
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(values.cat.categories))
+        return pd.Series(counts, index=values.cat.categories.astype(str))
+    return values.value_counts(sort=False).sort_index()
+
+def histogram_counts(values, max_bins=HISTOGRAM_MAX_BINS):
+    # Small-range integer columns get one bin per value; anything else is cut
+    # into at most `max_bins` equal-width bins. The result has one row per bin
+    # whatever the number of students.
+    values = np.asarray(values)
+    values = values[~pd.isna(values)]
+    low, high = values.min(), values.max()
+    if np.issubdtype(values.dtype, np.integer) and high - low < max_bins:
+        counts = np.bincount(values.astype(np.int64) - low)
+        starts = np.arange(low, high + 1)
+        return pd.DataFrame({'start': starts, 'width': 1, 'center': starts, 'count': counts})
+    counts, edges = np.histogram(values, bins=max_bins)
+    widths = np.diff(edges)
+    return pd.DataFrame({'start': edges[:-1], 'width': widths, 'center': edges[:-1] + widths / 2,
+                         'count': counts})
+
+def compute_demographics(data):
+    return demographics_from_counts(category_counts(data['gender']), histogram_counts(data['age']))
+
+def demographics_from_counts(gender_counts, age_bins):
+    gender_counts = gender_counts.copy()
+    gender_counts.index = [GENDER_LABELS.get(label, label) for label in gender_counts.index]
+    return DemographicStats(gender_counts, age_bins)
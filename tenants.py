@@ -0,0 +1,176 @@
+# Multi-school serving: one dataset, model and set of aggregates per school.
+# Schools come from datasource.load_tenants; each one's models live in its
+# own registry under models/<school>/ (the single default school keeps
+# models/), so switching schools loads a registered version instead of
+# retraining. Loaded schools are held in an LRU TenantCache shared by every
+# session; when their estimated size goes over the memory budget
+# (STUDENT_TENANT_MEMORY_MB) the least recently used ones are dropped and
+# reloaded from disk on their next visit.
+import os
+import threading
+from collections import OrderedDict
+
+from cohorts import CohortCube
+from datasource import DEFAULT_TENANT, load_tenants
+from engine import load_data
+from ingest import ingest_csv
+from instrumentation import stage
+from predictor import CachedPredictor
+from ranking import RankingIndex
+from registry import DEFAULT_REGISTRY_DIR, ModelRegistry
+from stats import compute_demographics, compute_term_stats
+
+DEFAULT_MEMORY_BUDGET_MB = int(os.environ.get('STUDENT_TENANT_MEMORY_MB', 1024))
+
+
+def tenant_registry(name):
+    root = DEFAULT_REGISTRY_DIR if name == DEFAULT_TENANT else os.path.join(DEFAULT_REGISTRY_DIR, name)
+    return ModelRegistry(root)
+
+
+class TenantBundle:
+    # Everything the app serves for one school. The table, model and
+    # whole-table aggregates are loaded up front; the cohort cube, ranking
+    # index, prediction cache and leaderboard on first use.
+    def __init__(self, name, config, registry, data, data_hash, aggregates, trained):
+        self.name = name
+        self.config = config
+        self.registry = registry
+        self.data = data
+        self.data_hash = data_hash
+        self.aggregates = aggregates  # StreamingAggregates in streaming mode, else None
+        self.trained = trained
+        if aggregates is not None:
+            self.term_stats = aggregates.term_stats()
+            self.demographics = aggregates.demographics()
+        else:
+            self.term_stats = compute_term_stats(data)
+            self.demographics = compute_demographics(data)
+        self.table_bytes = int(data.memory_usage(deep=True).sum()) if data is not None else 0
+        self._derived = {}
+        self._lock = threading.Lock()
+        self.on_grow = None  # called after an index is built, so the owning cache can recheck its budget
+
+    @classmethod
+    def load(cls, name, config, registry=None, on_progress=None):
+        # on_progress(fraction, rows) is only called while streaming a CSV
+        registry = registry or tenant_registry(name)
+        if config.streaming and config.format == 'csv':
+            with stage('load.stream'):
+                aggregates = ingest_csv(config.path, on_progress=on_progress)
+            with stage('model'):
+                trained = registry.load_or_register(aggregates.stats, aggregates.sketch)
+            return cls(name, config, registry, None, aggregates.data_hash, aggregates, trained)
+        data, data_hash = load_data(config)
+        with stage('model'):
+            trained = registry.load_or_train(data, data_hash)
+        return cls(name, config, registry, data, data_hash, None, trained)
+
+    def _derive(self, key, build):
+        with self._lock:
+            built = key not in self._derived
+            if built:
+                with stage(key):
+                    self._derived[key] = build()
+            item = self._derived[key]
+        if built and self.on_grow is not None:
+            self.on_grow()
+        return item
+
+    @property
+    def cohort_cube(self):
+        # Needs the full table, so None in streaming mode
+        if self.data is None:
+            return None
+        return self._derive('cohort_index', lambda: CohortCube(self.data))
+
+    @property
+    def ranking_index(self):
+        return self._derive('ranking_index', lambda: RankingIndex(self.data, self.trained))
+
+    @property
+    def predictor(self):
+        return self._derive('predictor', lambda: CachedPredictor(self.trained))
+
+    @property
+    def sketch(self):
+        # Training data sketch of the active model, for drift checks of uploads
+        return self._derive('sketch', self.registry.load_sketch)
+
+    @property
+    def leaderboard(self):
+        # Cross-validation leaderboard of the active model, when it came from `cli.py select`
+        return self._derive('leaderboard', self.registry.load_leaderboard)
+
+    def nbytes(self):
+        # Estimated resident size: the table and the numeric indexes. The
+        # model, aggregates and prediction cache are small next to them.
+        with self._lock:
+            derived = list(self._derived.values())
+        return self.table_bytes + sum(getattr(item, 'nbytes', 0) for item in derived)
+
+
+class TenantCache:
+    def __init__(self, tenants=None, budget_mb=DEFAULT_MEMORY_BUDGET_MB):
+        self.tenants = tenants if tenants is not None else load_tenants()
+        self.budget = budget_mb * 2**20
+        self._bundles = OrderedDict()
+        self._loading = {}  # name -> lock, so a school is loaded once however many sessions ask
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def names(self):
+        return list(self.tenants)
+
+    def get(self, name, on_progress=None):
+        if name not in self.tenants:
+            raise KeyError(f"Unknown school: {name}")
+        with self._lock:
+            bundle = self._bundles.get(name)
+            if bundle is not None:
+                self._bundles.move_to_end(name)
+                self.hits += 1
+            load_lock = self._loading.setdefault(name, threading.Lock())
+        if bundle is None:
+            with load_lock:
+                with self._lock:
+                    bundle = self._bundles.get(name)
+                if bundle is None:
+                    bundle = TenantBundle.load(name, self.tenants[name], on_progress=on_progress)
+                    bundle.on_grow = lambda: self._evict(keep=name)
+                    with self._lock:
+                        self.misses += 1
+                        self._bundles[name] = bundle
+                    self._evict(keep=name)
+        return bundle
+
+    def _evict(self, keep):
+        with self._lock:
+            sizes = {name: bundle.nbytes() for name, bundle in self._bundles.items()}
+            total = sum(sizes.values())
+            for name in list(self._bundles):
+                if total <= self.budget or len(self._bundles) == 1:
+                    break
+                if name != keep:
+                    del self._bundles[name]
+                    total -= sizes[name]
+                    self.evictions += 1
+
+    def loaded(self):
+        # (school, estimated MiB) of the held bundles, least recently used first
+        with self._lock:
+            bundles = list(self._bundles.items())
+        return [(name, bundle.nbytes() / 2**20) for name, bundle in bundles]
+
+    def info(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'loaded': len(self._bundles),
+                'schools': len(self.tenants),
+            }
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+
+from drift import FeatureSketch, check_csv, compare
+
+
+@pytest.fixture(scope='module')
+def reference(students):
+    return FeatureSketch().update(students)
+
+def _violations(report):
+    return {(row.column, row.kind): row.rows for row in report.violations.itertuples()}
+
+def test_training_data_is_stable(students, reference, trained):
+    report = compare(reference, FeatureSketch().update(students), trained.pipeline.label_encoders)
+    assert report.violations.empty
+    assert report.max_psi < 1e-6
+    assert not report.retrain
+
+def test_violations(students, reference, trained):
+    batch = students.astype({'gender': object, 'famsize': object, 'absences': object}).head(100)
+    batch.loc[:2, 'gender'] = 'X'
+    batch.loc[:4, 'Term_1'] = 25
+    batch.loc[:6, 'absences'] = 'abc'
+    batch.loc[:1, 'famsize'] = None
+    batch.loc[:9, 'age'] = 40
+    batch = batch.drop(columns=['health', 'Term_3'])
+    report = compare(reference, FeatureSketch().update(batch), trained.pipeline.label_encoders)
+    assert _violations(report) == {
+        ('gender', 'unseen_level'): 3,
+        ('Term_1', 'grade_out_of_range'): 5,
+        ('absences', 'not_numeric'): 7,
+        ('famsize', 'missing_value'): 2,
+        ('age', 'outside_training_range'): 10,
+        ('health', 'missing_column'): 100,  # Term_3 is not reported: uploads have no final grade yet
+    }
+    assert report.unseen_levels == ['gender']
+    assert report.violations.set_index(['column', 'kind']).loc[('gender', 'unseen_level'), 'examples'] == 'X'
+    assert report.retrain
+
+def test_shifted_column_drifts(students, reference):
+    older = students.assign(age=students['age'] + 3)
+    report = compare(reference, FeatureSketch().update(older))
+    assert report.drifted == ['age']
+    assert report.scores.loc[report.scores['column'] == 'age', 'status'].item() == 'drift'
+    assert report.retrain
+
+def test_sketch_roundtrip_and_csv_check(tmp_path, students, reference, trained):
+    path = str(tmp_path / 'sketch.npz')
+    reference.save(path)
+    loaded = FeatureSketch.load(path)
+    assert loaded.rows == reference.rows
+    for column, counts in reference.counts.items():
+        pd.testing.assert_series_equal(loaded.counts[column], counts, check_index_type=False, check_names=False)
+
+    csv = tmp_path / 'new.csv'
+    students.assign(gender=students['gender'].astype(object).where(students.index >= 3, 'X')).to_csv(csv, index=False)
+    report = check_csv(str(csv), loaded, trained.pipeline.label_encoders, chunksize=100)
+    assert report.rows == len(students)
+    assert _violations(report) == {('gender', 'unseen_level'): 3}
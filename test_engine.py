@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.preprocessing import LabelEncoder
+
+from conftest import STUDENTS_CSV
+from engine import TARGET, FeaturePipeline, preprocess_data
+
+STRING_COLUMNS = ['gender', 'famsize', 'Pstatus', 'internet']
+
+
+@pytest.fixture(scope='module')
+def raw():
+    # Plain read_csv: string columns as object, not the app's categories
+    return pd.read_csv(STUDENTS_CSV)
+
+@pytest.fixture(scope='module')
+def pipeline(raw):
+    features, label_encoders = preprocess_data(raw.drop(columns=[TARGET]))
+    return FeaturePipeline.fit(features, label_encoders)
+
+@pytest.mark.parametrize('column', STRING_COLUMNS)
+def test_codes_match_label_encoder(raw, students, pipeline, column):
+    expected = LabelEncoder().fit_transform(raw[column])
+    features, label_encoders = preprocess_data(raw)
+    np.testing.assert_array_equal(features[column], expected)
+    np.testing.assert_array_equal(label_encoders[column].transform(raw[column]), expected)
+    # The app's categorical columns encode the same
+    np.testing.assert_array_equal(pipeline.label_encoders[column].transform(students[column]), expected)
+
+def test_missing_and_blank_fields_get_training_defaults(raw, pipeline):
+    i_gender, i_absences = pipeline.positions['gender'], pipeline.positions['absences']
+    assert pipeline.defaults[i_absences] == pytest.approx(raw['absences'].mean())
+    assert pipeline.defaults[i_gender] == np.bincount(LabelEncoder().fit_transform(raw['gender'])).argmax()
+
+    frame = raw.drop(columns=[TARGET, 'absences']).head(3).astype({'gender': object})
+    frame.loc[0, 'gender'] = None
+    X = pipeline.transform(frame)
+    np.testing.assert_array_equal(X[:, i_absences], pipeline.defaults[i_absences])
+    assert X[0, i_gender] == pipeline.defaults[i_gender]
+    assert X[1, i_gender] == pipeline.label_encoders['gender'].transform([frame.loc[1, 'gender']])[0]
+
+    record = pipeline.transform_record({'gender': None, 'age': 17})
+    expected = pipeline.defaults.copy()
+    expected[pipeline.positions['age']] = 17
+    np.testing.assert_array_equal(record[0], expected)
+
+def test_unseen_level_raises(raw, pipeline):
+    frame = raw.drop(columns=[TARGET]).head(3).assign(internet=['yes', 'maybe', 'no'])
+    with pytest.raises(ValueError, match="unseen labels: \\['maybe'\\]"):
+        pipeline.transform(frame)
+    with pytest.raises(ValueError, match='maybe'):
+        pipeline.transform_record({'internet': 'maybe'})
+
+def test_record_and_grid_match_frame(raw, pipeline):
+    frame = raw.drop(columns=[TARGET]).head(20)
+    X = pipeline.transform(frame)
+    for i, record in enumerate(frame.to_dict('records')):
+        np.testing.assert_array_equal(pipeline.transform_record(record)[0], X[i])
+
+    record = frame.iloc[0].to_dict()
+    axes = {'absences': [0, 4, 10], 'gender': ['F', 'M'], 'activities': ['yes', 'no']}
+    grid = pipeline.transform_grid(record, axes)
+    rows = [dict(record, absences=absences, gender=gender)
+            for absences in axes['absences'] for gender in axes['gender'] for _ in axes['activities']]
+    np.testing.assert_array_equal(grid, pipeline.transform(pd.DataFrame(rows)))
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import STUDENTS_CSV
+from datasource import read_csv
+from engine import HASH_BLOCK_ROWS, TARGET, DatasetHasher, dataset_hash, preprocess_data
+from incremental import IncrementalStats
+from ingest import ingest_csv
+from registry import ModelRegistry
+from stats import compute_demographics, compute_term_stats
+
+
+@pytest.fixture(scope='module')
+def many_students(students):
+    # Enough rows to span several hash blocks
+    copies = HASH_BLOCK_ROWS * 2 // len(students) + 1
+    return pd.concat([students] * copies, ignore_index=True)
+
+@pytest.mark.parametrize('chunksize', [1_000, HASH_BLOCK_ROWS, HASH_BLOCK_ROWS + 1, 100_000])
+def test_hasher_chunks_match_one_pass(many_students, chunksize):
+    hasher = DatasetHasher()
+    for start in range(0, len(many_students), chunksize):
+        hasher.update(many_students.iloc[start:start + chunksize])
+    assert hasher.hexdigest() == dataset_hash(many_students)
+
+def test_hasher_depends_on_row_order(students):
+    assert dataset_hash(students) != dataset_hash(students.iloc[::-1])
+
+def test_partial_fit_matches_full_fit(students):
+    full = IncrementalStats.fit(students)
+    stepwise = IncrementalStats.fit(students.iloc[:300]).partial_fit(students.iloc[300:])
+    assert stepwise.rows == full.rows
+    np.testing.assert_allclose(stepwise.model().coef_, full.model().coef_, atol=1e-8)
+    assert stepwise.to_trained().data_hash == full.to_trained().data_hash == dataset_hash(students)
+
+def test_saved_stats_continue_the_hash_chain(tmp_path, students):
+    path = str(tmp_path / 'stats.npz')
+    IncrementalStats.fit(students.iloc[:500]).save(path)
+    stats = IncrementalStats.load(path).partial_fit(students.iloc[500:])
+    assert stats.hasher.hexdigest() == dataset_hash(students)
+
+def test_update_hash_matches_appended_file(tmp_path, students):
+    # As `cli.py update`: the new rows come from their own CSV, in chunks
+    registry = ModelRegistry(str(tmp_path / 'models'))
+    head = students.iloc[:500]
+    registry.train(head, dataset_hash(head))
+    tail_csv = tmp_path / 'tail.csv'
+    students.iloc[500:].to_csv(tail_csv, index=False)
+    version, trained = registry.update(read_csv(tail_csv, chunksize=40))
+    assert version == 'v2'
+    assert trained.data_hash == dataset_hash(students)
+    assert registry.entry()['rows'] == len(students)
+    assert registry.find(dataset_hash(students)) == 'v2'
+
+@pytest.mark.parametrize('chunksize', [7, 100, 649, 100_000])
+def test_streaming_matches_in_memory(students, chunksize):
+    # Encoders are fixed by the first chunk, so it must hold every level
+    aggregates = ingest_csv(STUDENTS_CSV, chunksize=chunksize)
+    assert aggregates.rows == len(students)
+    assert aggregates.data_hash == dataset_hash(students)
+    pd.testing.assert_frame_equal(aggregates.term_stats().summary, compute_term_stats(students).summary,
+                                  check_dtype=False)
+    demographics, expected = aggregates.demographics(), compute_demographics(students)
+    pd.testing.assert_series_equal(demographics.gender, expected.gender, check_dtype=False)
+    pd.testing.assert_frame_equal(demographics.age, expected.age, check_dtype=False)
+
+def test_streamed_model_is_ols_on_every_row(students):
+    from sklearn.linear_model import LinearRegression
+
+    trained = ingest_csv(STUDENTS_CSV, chunksize=100).stats.to_trained()
+    features, _ = preprocess_data(students)
+    target = features.pop(TARGET)
+    ols = LinearRegression().fit(features, target)
+    np.testing.assert_allclose(trained.model.coef_, ols.coef_, atol=1e-8)
+    assert trained.model.intercept_ == pytest.approx(ols.intercept_)
@@ -0,0 +1,65 @@
+import threading
+
+import pytest
+
+from engine import TARGET
+from predictor import CachedPredictor
+
+
+def _records(students, n):
+    return students.drop(columns=[TARGET]).drop_duplicates().head(n).to_dict('records')
+
+def _expected(trained, record):
+    return float(trained.model.predict(trained.pipeline.transform_record(record))[0])
+
+def _predict_together(predictor, records, monkeypatch):
+    # Every caller has counted itself in flight before any reaches the
+    # queue, so the first one always waits for the rest to join its batch
+    arrived = threading.Barrier(len(records))
+    transform_record = predictor.trained.pipeline.transform_record
+
+    def transform_after_all_arrive(record):
+        arrived.wait(timeout=10)
+        return transform_record(record)
+
+    monkeypatch.setattr(predictor.trained.pipeline, 'transform_record', transform_after_all_arrive)
+    results = [None] * len(records)
+
+    def call(i):
+        results[i] = predictor.predict(records[i])
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(len(records))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=30)
+    monkeypatch.undo()
+    return results
+
+def test_concurrent_misses_are_scored_in_one_batch(students, trained, monkeypatch):
+    records = _records(students, 16)
+    predictor = CachedPredictor(trained, window=10, max_batch=len(records))
+    results = _predict_together(predictor, records, monkeypatch)
+    assert results == [pytest.approx(_expected(trained, record)) for record in records]
+    info = predictor.info()
+    assert (info['misses'], info['batches'], info['batched_rows'], info['size']) == (16, 1, 16, 16)
+
+def test_concurrent_misses_for_one_record_share_a_row(students, trained, monkeypatch):
+    records = _records(students, 1) * 8
+    predictor = CachedPredictor(trained, window=0.05)
+    results = _predict_together(predictor, records, monkeypatch)
+    assert results == [pytest.approx(_expected(trained, records[0]))] * 8
+    assert predictor.info()['batched_rows'] == 1
+
+def test_repeat_lookups_hit_the_cache(students, trained):
+    record = _records(students, 1)[0]
+    predictor = CachedPredictor(trained)
+    first = predictor.predict(record)
+    assert predictor.predict(dict(record, Term_3=0)) == first  # fields outside the model share the entry
+    assert (predictor.info()['hits'], predictor.info()['misses']) == (1, 1)
+
+def test_cache_is_bounded(students, trained):
+    predictor = CachedPredictor(trained, maxsize=4)
+    for record in _records(students, 10):
+        predictor.predict(record)
+    assert predictor.info()['size'] == 4
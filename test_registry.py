@@ -0,0 +1,100 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import cli
+from conftest import STUDENTS_CSV
+from datasource import compact_frame, read_csv
+from engine import dataset_hash
+from registry import ModelRegistry
+
+
+def _start_replica(root):
+    data = compact_frame(read_csv(STUDENTS_CSV))
+    return ModelRegistry(root).load_or_train(data, dataset_hash(data)).data_hash
+
+def test_replicas_starting_together_train_once(tmp_path):
+    root = str(tmp_path / 'models')
+    with ProcessPoolExecutor(max_workers=6) as pool:
+        hashes = list(pool.map(_start_replica, [root] * 6))
+    registry = ModelRegistry(root)
+    assert len(set(hashes)) == 1
+    assert [entry['version'] for entry in registry.versions()] == ['v1']
+    assert registry.current() == 'v1'
+    assert not list(tmp_path.glob('models/*.tmp'))
+
+def test_activate_rolls_back(tmp_path, students):
+    registry = ModelRegistry(str(tmp_path))
+    registry.train(students.iloc[:400], dataset_hash(students.iloc[:400]))
+    registry.train(students, dataset_hash(students))
+    registry.activate('v1')
+    assert registry.current() == 'v1'
+    assert registry.load().data_hash == dataset_hash(students.iloc[:400])
+
+def test_stable_data_reuses_the_model_and_can_be_updated(tmp_path, students):
+    registry = ModelRegistry(str(tmp_path))
+    head, more = students.iloc[:560], students.iloc[:600]
+    registry.train(head, dataset_hash(head))
+    trained = registry.load_or_train(more, dataset_hash(more))
+    entry = registry.entry()
+    assert (entry['version'], entry['method'], entry['rows']) == ('v2', 'reused', 600)
+    assert trained.data_hash == dataset_hash(more)
+    assert registry.load_stats('v2').rows == 600
+
+    version, updated = registry.update([students.iloc[600:]])
+    assert version == 'v3'
+    assert updated.data_hash == dataset_hash(students)
+
+def test_drifted_data_retrains(tmp_path, students):
+    registry = ModelRegistry(str(tmp_path))
+    registry.train(students, dataset_hash(students))
+    older = students.assign(age=students['age'] + 3)
+    registry.load_or_train(older, dataset_hash(older))
+    entry = registry.entry()
+    assert (entry['version'], entry['method']) == ('v2', 'full')
+    assert entry['drift'] > 0.25
+
+def test_drift_retrain_needs_final_grades(tmp_path, students, capsys):
+    registry_dir = str(tmp_path / 'models')
+    ModelRegistry(registry_dir).train(students, dataset_hash(students))
+    upload = tmp_path / 'upload.csv'
+    students.assign(age=students['age'] + 3).drop(columns=['Term_3']).to_csv(upload, index=False)
+    with pytest.raises(SystemExit) as exit_info:
+        cli.main(['--registry', registry_dir, 'drift', str(upload), '--retrain'])
+    assert exit_info.value.code == 1
+    assert 'has no Term_3 column' in capsys.readouterr().err
+    assert len(ModelRegistry(registry_dir).versions()) == 1
+
+def test_rollback_survives_startup(tmp_path, students):
+    registry = ModelRegistry(str(tmp_path))
+    registry.train(students.iloc[:400], dataset_hash(students.iloc[:400]))
+    registry.train(students, dataset_hash(students))
+    registry.activate('v1')
+    trained = registry.load_or_train(students, dataset_hash(students))
+    assert registry.current() == 'v1'
+    assert trained.data_hash == dataset_hash(students.iloc[:400])
+    assert len(registry.versions()) == 2
+
+def test_reused_selected_model_cannot_be_updated(tmp_path, students):
+    registry = ModelRegistry(str(tmp_path))
+    head, more = students.iloc[:560], students.iloc[:600]
+    registry.select(head, dataset_hash(head), folds=2, workers=1)
+    registry.load_or_train(more, dataset_hash(more))
+    assert registry.entry()['method'] == 'reused'
+    with pytest.raises(FileNotFoundError, match='can only be retrained'):
+        registry.update([students.iloc[600:]])
+    assert len(registry.versions()) == 2
+
+def test_drift_retrain_survives_startup(tmp_path, students, monkeypatch):
+    monkeypatch.setenv('STUDENT_DATA_CACHE_DIR', str(tmp_path / 'cache'))
+    registry_dir = str(tmp_path / 'models')
+    ModelRegistry(registry_dir).train(students, dataset_hash(students))
+    new_rows = tmp_path / 'new.csv'
+    students.assign(age=students['age'] + 3).to_csv(new_rows, index=False)
+    cli.main(['--registry', registry_dir, 'drift', str(new_rows), '--retrain'])
+    registry = ModelRegistry(registry_dir)
+    assert (registry.current(), registry.entry()['rows']) == ('v2', 2 * len(students))
+
+    # The dashboard starting on the configured data keeps the retrained model
+    registry.load_or_train(students, dataset_hash(students))
+    assert registry.current() == 'v2'
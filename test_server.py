@@ -0,0 +1,57 @@
+import json
+import socket
+import threading
+import urllib.request
+
+import pytest
+
+from engine import TARGET
+from server import DEFAULT_BACKLOG, make_server
+
+
+@pytest.fixture
+def server(trained):
+    server = make_server(trained, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def _url(server, path):
+    return f"http://127.0.0.1:{server.server_address[1]}{path}"
+
+def test_backlog_is_configurable(trained):
+    server = make_server(trained, port=0, backlog=256)
+    server.server_close()
+    assert server.request_queue_size == 256
+    assert DEFAULT_BACKLOG >= 128
+
+def test_burst_of_connections_is_queued(trained):
+    # Connections made before the server accepts any wait in the listen
+    # backlog; with the standard library's 5, the rest would time out
+    server = make_server(trained, port=0)
+    try:
+        clients = [socket.create_connection(server.server_address, timeout=2) for _ in range(100)]
+    except OSError:
+        server.server_close()
+        raise
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        for client in clients:
+            client.sendall(b'GET /health HTTP/1.0\r\n\r\n')
+        for client in clients:
+            with client, client.makefile('rb') as response:
+                assert response.readline().split()[1] == b'200'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def test_predict(server, students):
+    records = json.loads(students.drop(columns=[TARGET]).head(3).to_json(orient='records'))
+    request = urllib.request.Request(_url(server, '/predict'), data=json.dumps(records).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=30) as response:
+        predictions = json.load(response)['predictions']
+    assert len(predictions) == 3
+    assert all({'Predicted_Grade', 'Performance'} <= set(prediction) for prediction in predictions)
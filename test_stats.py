@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from cohorts import CohortCube
+from stats import TERM_COLUMNS, _quantile_from_counts, compute_term_stats, term_stats_from_counts
+
+
+@pytest.mark.parametrize('grades', [
+    [10],
+    [0, 20],
+    [7, 7, 7, 7],
+    [3, 5, 5, 8, 12, 12, 12, 19],
+    np.random.default_rng(0).integers(0, 21, size=999).tolist(),
+])
+@pytest.mark.parametrize('q', [0.0, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0])
+def test_quantile_from_counts_matches_pandas(grades, q):
+    counts = np.bincount(grades, minlength=21)
+    quantile = _quantile_from_counts(np.arange(21), np.cumsum(counts), q)
+    assert quantile == pytest.approx(pd.Series(grades).quantile(q))
+
+def test_term_stats_match_pandas(students):
+    summary = compute_term_stats(students).summary
+    for term in TERM_COLUMNS:
+        grades = students[term].astype(float)
+        assert summary.loc[term, 'count'] == len(grades)
+        assert summary.loc[term, 'mean'] == pytest.approx(grades.mean())
+        assert summary.loc[term, 'median'] == pytest.approx(grades.median())
+        assert summary.loc[term, 'min'] == grades.min()
+        assert summary.loc[term, 'max'] == grades.max()
+
+def test_term_stats_of_no_students():
+    summary = term_stats_from_counts(np.zeros((len(TERM_COLUMNS), 21), dtype=np.int64)).summary
+    assert summary['count'].tolist() == [0, 0, 0]
+    assert summary['fail_count'].tolist() == [0, 0, 0]
+    assert summary[['mean', 'pass_rate', 'median', 'min', 'max']].isna().all().all()
+
+def test_empty_cohort_aggregates(students):
+    # Age 22, female, no internet: no such student in students.csv
+    cube = CohortCube(students)
+    filters = {'age': [22], 'gender': ['F'], 'internet': ['no']}
+    assert cube.size(filters) == 0
+    assert cube.term_stats(filters).summary['count'].sum() == 0
+    assert cube.demographics(filters).gender.sum() == 0
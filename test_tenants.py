@@ -0,0 +1,63 @@
+import pytest
+
+import tenants
+from datasource import DataSourceConfig
+from tenants import TenantCache
+
+SCHOOLS = ['north', 'south', 'east']
+
+
+@pytest.fixture
+def schools(tmp_path, students, monkeypatch):
+    # Three schools of equal size, each with its own registry under tmp_path
+    monkeypatch.setattr(tenants, 'DEFAULT_REGISTRY_DIR', str(tmp_path / 'models'))
+    configs = {}
+    for i, name in enumerate(SCHOOLS):
+        path = str(tmp_path / f'{name}.csv')
+        students.iloc[i * 200:(i + 1) * 200].to_csv(path, index=False)
+        configs[name] = DataSourceConfig(path, 'csv', None)
+    return configs
+
+def _bundle_mib(schools):
+    return TenantCache(schools).get('north').nbytes() / 2**20
+
+def _loaded(cache):
+    return [name for name, _ in cache.loaded()]
+
+def test_least_recently_used_order(schools):
+    cache = TenantCache(schools)
+    for name in ['north', 'south', 'east', 'north']:
+        cache.get(name)
+    assert _loaded(cache) == ['south', 'east', 'north']
+    assert (cache.info()['hits'], cache.info()['misses'], cache.info()['evictions']) == (1, 3, 0)
+    with pytest.raises(KeyError):
+        cache.get('west')
+
+def test_least_recently_used_school_is_evicted(schools):
+    cache = TenantCache(schools, budget_mb=2.5 * _bundle_mib(schools))
+    north = cache.get('north')
+    cache.get('south')
+    cache.get('north')
+    cache.get('east')
+    assert _loaded(cache) == ['north', 'east']
+    assert cache.info()['evictions'] == 1
+    assert cache.get('north') is north
+    cache.get('south')  # reloaded from its registry, not retrained
+    assert _loaded(cache) == ['north', 'south']
+    assert cache.info()['misses'] == 4
+    assert [entry['version'] for entry in tenants.tenant_registry('south').versions()] == ['v1']
+
+def test_school_over_budget_is_kept_while_in_use(schools):
+    cache = TenantCache(schools, budget_mb=0)
+    cache.get('north')
+    cache.get('south')
+    assert _loaded(cache) == ['south']  # a lone school stays, however big
+
+    cache = TenantCache(schools, budget_mb=2.5 * _bundle_mib(schools))
+    north = cache.get('north')
+    cache.get('south')
+    # Building an index grows the least recently used school past the budget;
+    # the other school is dropped rather than the one being used
+    north.cohort_cube
+    assert _loaded(cache) == ['north']
+    assert cache.info()['evictions'] == 1